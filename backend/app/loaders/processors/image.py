@@ -54,8 +54,8 @@ class ImageProcessor(ContentProcessor):
         
         # Extract text from image using async OCR
         #ocr_text = await self._extract_text(content)
-        image_analyzer = AzureVisionAnalyzer()
-        ocr_text, caption = await image_analyzer.analyze_image(link)
+        async with AzureVisionAnalyzer() as image_analyzer:
+            ocr_text, caption = await image_analyzer.analyze_image(link)
         ocr_text_md = f"```text\n{ocr_text}\n```\n" if ocr_text else ""
         description = await self.describe_image(content)
         markdown_content = f"{markdown_link}\n\n{ocr_text_md}\n\n{description}"
@@ -1,6 +1,9 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import logging
+import logging.handlers
+import queue
 import time
 from contextlib import asynccontextmanager
 from functools import lru_cache
@@ -10,9 +13,25 @@ from .core.config import settings
 from .services.db.cosmos_db import CosmosDBNotesService
 
 
+def setup_queue_logging() -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue so handler I/O (stdout writes)
+    happens on a background thread instead of the event loop.
+    """
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    listener = logging.handlers.QueueListener(
+        log_queue, *root.handlers or [logging.StreamHandler()], respect_handler_level=True
+    )
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events for the FastAPI app"""
+    log_listener = setup_queue_logging()
     # TODO: Cosmos Client should be global as singleton
     # Get settings and initialize services
     service = CosmosDBNotesService(
@@ -40,6 +59,7 @@ async def lifespan(app: FastAPI):
     yield
     
     # Cleanup on shutdown
+    log_listener.stop()
     # await service.client.close()
 
 app = FastAPI(
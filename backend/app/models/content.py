@@ -1,9 +1,9 @@
 from enum import Enum
-from typing import Optional, Any, Dict, List, Union
+from typing import Annotated, Optional, Any, Dict, List, Literal, Union
 from uuid import uuid4
 from datetime import datetime, timezone, timedelta
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class ContentType(str, Enum):
@@ -25,11 +25,13 @@ class BaseContent(BaseModel):
 
 
 class TextContent(BaseContent):
-    type: ContentType = Field(default=ContentType.TEXT)
+    type: Literal[ContentType.TEXT] = Field(default=ContentType.TEXT)
     
 
 class FileContent(BaseContent):
-    type: ContentType = Field(default=ContentType.FILE)
+    # DOCUMENT is accepted for documents stored before they were folded
+    # into FileContent
+    type: Literal[ContentType.FILE, ContentType.DOCUMENT] = Field(default=ContentType.FILE)
     storage_url: str
     storage_path: str
     original_filename: Optional[str] = None
@@ -39,7 +41,7 @@ class FileContent(BaseContent):
 
 
 class ImageContent(FileContent):
-    type: ContentType = Field(default=ContentType.IMAGE)
+    type: Literal[ContentType.IMAGE] = Field(default=ContentType.IMAGE)
     thumbnail_path: Optional[str] = None
     
     # Image metadata
@@ -49,7 +51,7 @@ class ImageContent(FileContent):
 
 
 class VideoContent(FileContent):
-    type: ContentType = Field(default=ContentType.VIDEO)
+    type: Literal[ContentType.VIDEO] = Field(default=ContentType.VIDEO)
     thumbnail_path: Optional[str] = None
     
     # Video metadata
@@ -66,12 +68,12 @@ class VideoContent(FileContent):
 
 
 class LinkContent(FileContent):
-    type: ContentType = Field(default=ContentType.LINK)
+    type: Literal[ContentType.LINK] = Field(default=ContentType.LINK)
     url: str
     
 
 class AudioContent(FileContent):
-    type: ContentType = Field(default=ContentType.AUDIO)
+    type: Literal[ContentType.AUDIO] = Field(default=ContentType.AUDIO)
     
     # Audio metadata
     duration_seconds: Optional[int]
@@ -91,16 +93,24 @@ CONTENT_CLASS_MAP = {
     ContentType.AUDIO: AudioContent
 }
 
-def parse_content(data: Dict[str, Any]) -> FileContent:
-    """Parse raw dictionary into appropriate content type"""
-    cls = CONTENT_CLASS_MAP.get(ContentType(data["type"]), FileContent)
-    return cls(**data)
 
+# Discriminated union: pydantic-core resolves the 'type' tag and builds the
+# right submodel directly, instead of Python-level dispatch per item
+ContentUnion = Annotated[
+    Union[
+        TextContent,
+        ImageContent,
+        VideoContent,
+        AudioContent,
+        FileContent,
+        LinkContent
+    ],
+    Field(discriminator="type")
+]
+
+_CONTENT_ADAPTER = TypeAdapter(ContentUnion)
 
-ContentUnion = Union[
-    TextContent,
-    ImageContent,
-    VideoContent,
-    FileContent,
-    LinkContent
-]
\ No newline at end of file
+
+def parse_content(data: Dict[str, Any]) -> FileContent:
+    """Parse raw dictionary into appropriate content type"""
+    return _CONTENT_ADAPTER.validate_python(data)
\ No newline at end of file
@@ -1,10 +1,16 @@
+import asyncio
 from datetime import datetime
+from functools import lru_cache
 import json
-from typing import Dict, Any, List, Optional, Tuple
+import logging
+import time
+from typing import AsyncIterator, Dict, Any, List, Optional, Set, Tuple
 
+import aiohttp
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.indexes.aio import SearchIndexClient
 from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport
 from azure.search.documents.indexes.models import (
     SearchIndex,
     SimpleField,
@@ -15,6 +21,10 @@ from azure.search.documents.indexes.models import (
     VectorSearchAlgorithmConfiguration,
     HnswParameters,
     VectorSearchProfile,
+    ScalarQuantizationCompression,
+    ScoringProfile,
+    FreshnessScoringFunction,
+    FreshnessScoringParameters,
     SearchField
 )
 
@@ -22,20 +32,135 @@ from .base import NotesDbService
 from ...models.note import Note, NoteReference
 
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1024)
+def _build_filter(
+    user_id: Optional[str],
+    categories: Optional[str],
+    tags: Optional[Tuple[str, ...]],
+    entities: Optional[Tuple[str, ...]] = None
+) -> Optional[str]:
+    """
+    Build (and memoize) the OData filter string for the common
+    userId/categories/tags/entities combinations. Inputs must be hashable,
+    so list-valued filters are passed as tuples.
+    """
+    filter_conditions = []
+    if user_id:
+        filter_conditions.append(f"userId eq '{user_id}'")
+    if categories:
+        filter_conditions.append(f"categories/any(c: c eq '{categories}')")
+    if tags:
+        filter_conditions.append("tags/any(t: search.in(t, '{}'))".format("','".join(tags)))
+    if entities:
+        entity_conditions = [f"entities/any(e: e eq '{entity}')" for entity in entities]
+        filter_conditions.append("({})".format(" or ".join(entity_conditions)))
+    return " and ".join(filter_conditions) if filter_conditions else None
+
+
 class AzureAISearchNotesService(NotesDbService):
+    # How long get_distinct_* results are served from memory before
+    # hitting the service again
+    FACET_CACHE_TTL_SECONDS = 60
+
     def __init__(self, search_endpoint: str, index_name: str, credential):
         self.search_endpoint = search_endpoint
         self.index_name = index_name
-        self.credential = credential
+        # One credential instance shared by both clients
+        self.credential = AzureKeyCredential(credential)
+        # Tuned shared transport: the SDK default connector caps concurrent
+        # connections well below what concurrent hybrid_search/create_note
+        # load needs, and re-resolves DNS per connection
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=100,
+                ttl_dns_cache=300,
+                keepalive_timeout=75
+            )
+        )
+        self._transport = AioHttpTransport(session=self._session, session_owner=False)
         self.search_client = SearchClient(
             endpoint=search_endpoint,
             index_name=index_name,
-            credential=AzureKeyCredential(credential)
+            credential=self.credential,
+            transport=self._transport
         )
         self.index_client = SearchIndexClient(
             endpoint=search_endpoint,
-            credential=AzureKeyCredential(credential)
+            credential=self.credential,
+            transport=self._transport
         )
+        # TTL cache for slow-changing facet lookups (get_distinct_*),
+        # keyed by facet name -> (fetched_at, values)
+        self._facet_cache: Dict[str, Tuple[float, Set[str]]] = {}
+
+    async def close(self) -> None:
+        """Close both clients and the shared HTTP session."""
+        await self.search_client.close()
+        await self.index_client.close()
+        await self._session.close()
+
+    def _get_cached_facet(self, facet: str) -> Optional[Set[str]]:
+        """Return cached facet values if still fresh, else None."""
+        cached = self._facet_cache.get(facet)
+        if cached and (time.monotonic() - cached[0]) < self.FACET_CACHE_TTL_SECONDS:
+            return cached[1]
+        return None
+
+    def _set_cached_facet(self, facet: str, values: Set[str]) -> None:
+        self._facet_cache[facet] = (time.monotonic(), values)
+
+    def _invalidate_facet_cache(self, *facets: str) -> None:
+        """Drop cached facets after a write touches them."""
+        for facet in facets or ("categories", "tags", "entities"):
+            self._facet_cache.pop(facet, None)
+
+    @classmethod
+    async def bootstrap(
+        cls,
+        search_endpoint: str,
+        credential,
+        index_names: List[str],
+        embedding_dimension: int = 1536
+    ) -> Dict[str, bool]:
+        """
+        Create several search indexes concurrently (multi-tenant setups).
+
+        Index creation is idempotent here: an already-existing index surfaces
+        as False from create_search_index and bootstrap carries on, so the
+        wall-clock cost of an N-index setup is the slowest create instead of
+        the sum of all of them.
+
+        Returns:
+            Dict[str, bool]: index name -> whether it was newly created
+        """
+        services = [cls(search_endpoint, name, credential) for name in index_names]
+        try:
+            created = await asyncio.gather(
+                *(service.create_search_index(embedding_dimension) for service in services)
+            )
+        finally:
+            # Each service owns a ClientSession; release them even when a
+            # create fails, or bootstrap leaks one session per index
+            await asyncio.gather(*(service.close() for service in services))
+        return dict(zip(index_names, created))
+
+    @staticmethod
+    def _entities_to_list(entities: Optional[Dict[str, str]]) -> List[str]:
+        """Flatten the entities dict to 'name:type' strings for the index."""
+        return [f"{name}:{etype}" for name, etype in (entities or {}).items()]
+
+    @staticmethod
+    def _entities_from_list(entities: Optional[List[str]]) -> Dict[str, str]:
+        """Rebuild the entities dict from the indexed 'name:type' strings."""
+        result = {}
+        for entry in entities or []:
+            name, _, etype = entry.partition(":")
+            result[name] = etype
+        return result
 
     def _note_to_doc(self, note: Note) -> Dict[str, Any]:
         """Convert Note to search document"""
@@ -48,7 +173,7 @@ class AzureAISearchNotesService(NotesDbService):
             "title": note.title,
             "tags": note.tags,
             "summary": note.summary,
-            "entities": json.dumps(note.entities),
+            "entities": self._entities_to_list(note.entities),
             "embedding": note.embedding,
             "linkedNotes": json.dumps([ref.dict() for ref in note.linked_notes]),
             "createdAt": note.created_at.isoformat(),
@@ -56,6 +181,32 @@ class AzureAISearchNotesService(NotesDbService):
             "metadata": json.dumps(note.metadata)
         }
 
+    def _doc_to_note_light(self, doc: Dict[str, Any]) -> Note:
+        """
+        Convert search document to Note without re-parsing datetimes.
+
+        List endpoints only serialize the notes back to JSON, so the ISO
+        timestamp strings are kept as-is and parsing is deferred to whoever
+        actually needs a datetime (e.g. the response schema). Saves two
+        `datetime.fromisoformat` calls per row on list views.
+        """
+        return Note.model_construct(
+            note_id=doc["id"],
+            user_id=doc.get("userId"),
+            content=doc.get("content"),
+            content_map=json.loads(doc.get("contentMap", "{}")),
+            categories=doc.get("categories", []),
+            title=doc.get("title"),
+            tags=doc.get("tags", []),
+            summary=doc.get("summary"),
+            entities=self._entities_from_list(doc.get("entities")),
+            embedding=doc.get("embedding"),
+            linked_notes=[NoteReference(**ref) for ref in json.loads(doc.get("linkedNotes", "[]"))],
+            created_at=doc["createdAt"],
+            updated_at=doc["updatedAt"],
+            metadata=json.loads(doc.get("metadata", "{}"))
+        )
+
     def _doc_to_note(self, doc: Dict[str, Any]) -> Note:
         """Convert search document back to Note"""
         return Note(
@@ -67,7 +218,7 @@ class AzureAISearchNotesService(NotesDbService):
             title=doc.get("title"),
             tags=doc.get("tags", []),
             summary=doc.get("summary"),
-            entities=json.loads(doc.get("entities", "{}")),
+            entities=self._entities_from_list(doc.get("entities")),
             embedding=doc.get("embedding"),
             linked_notes=[NoteReference(**ref) for ref in json.loads(doc.get("linkedNotes", "[]"))],
             created_at=datetime.fromisoformat(doc["createdAt"]),
@@ -78,6 +229,7 @@ class AzureAISearchNotesService(NotesDbService):
     async def create_note(self, note) -> Note:
         doc = self._note_to_doc(note)
         await self.search_client.upload_documents([doc])
+        self._invalidate_facet_cache()
         return note
 
     async def get_note(self, note_id) -> Optional[Note]:
@@ -91,6 +243,7 @@ class AzureAISearchNotesService(NotesDbService):
         try:
             doc = self._note_to_doc(note)
             await self.search_client.merge_documents([doc])
+            self._invalidate_facet_cache()
             return True
         except:
             return False
@@ -98,20 +251,13 @@ class AzureAISearchNotesService(NotesDbService):
     async def delete_note(self, note_id) -> bool:
         try:
             await self.search_client.delete_documents([{"id": note_id}])
+            self._invalidate_facet_cache()
             return True
         except:
             return False
 
     async def search_notes(self, user_id=None, categories=None, tags=None, search_text=None, limit=10) -> List[Note]:
-        filter_conditions = []
-        if user_id:
-            filter_conditions.append(f"userId eq '{user_id}'")
-        if categories:
-            filter_conditions.append(f"categories/any(c: c eq '{categories}')")
-        if tags:
-            filter_conditions.append("tags/any(t: search.in(t, '{}'))".format("','".join(tags)))
-
-        filter_str = " and ".join(filter_conditions) if filter_conditions else None
+        filter_str = _build_filter(user_id, categories, tuple(tags) if tags else None)
         
         results = await self.search_client.search(
             search_text=search_text,
@@ -122,9 +268,45 @@ class AzureAISearchNotesService(NotesDbService):
         
         notes = []
         async for doc in results:
-            notes.append(self._doc_to_note(doc))
+            notes.append(self._doc_to_note_light(doc))
         return notes
 
+    async def iter_search(
+        self,
+        user_id=None,
+        categories=None,
+        tags=None,
+        search_text=None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Note]:
+        """
+        Stream search results as an async generator.
+
+        Unlike search_notes this never materializes the full result list, so
+        peak memory stays at one page, and the next page is prefetched while
+        the current one is being decoded — callers (e.g. a StreamingResponse)
+        overlap their serialization with the next network fetch.
+        """
+        filter_str = _build_filter(user_id, categories, tuple(tags) if tags else None)
+
+        results = await self.search_client.search(
+            search_text=search_text,
+            filter=filter_str,
+            top=limit
+        )
+
+        pages = results.by_page()
+        next_page_task = asyncio.ensure_future(pages.__anext__())
+        while True:
+            try:
+                page = await next_page_task
+            except StopAsyncIteration:
+                break
+            # Kick off the next page fetch before decoding this one
+            next_page_task = asyncio.ensure_future(pages.__anext__())
+            async for doc in page:
+                yield self._doc_to_note_light(doc)
+
     async def vector_search(self, query_embedding, limit=10, min_similarity=0.7) -> List[Tuple[Note, float]]:
         vector_query = {
             "vector": query_embedding,
@@ -155,16 +337,12 @@ class AzureAISearchNotesService(NotesDbService):
                           entities=None,
                           min_similarity=0.7,
                           limit=10):
-        filter_conditions = []
-        if user_id:
-            filter_conditions.append(f"userId eq '{user_id}'")
-        if categories:
-            filter_conditions.append(f"categories/any(c: c eq '{categories}')")
-        if tags:
-            filter_conditions.append("tags/any(t: search.in(t, '{}'))".format("','".join(tags)))
-        if entities:
-            entity_conditions = [f"entities/any(e: e eq '{entity}')" for entity in entities]
-            filter_conditions.append(" or ".join(entity_conditions))
+        filter_str = _build_filter(
+            user_id,
+            categories,
+            tuple(tags) if tags else None,
+            tuple(entities) if entities else None
+        )
 
         vector_query = {
             "vector": query_embedding,
@@ -175,7 +353,7 @@ class AzureAISearchNotesService(NotesDbService):
         results = await self.search_client.search(
             search_text=query_text,
             vector_queries=[vector_query],
-            filter=" and ".join(filter_conditions) if filter_conditions else None,
+            filter=filter_str,
             select=["*"],
             top=limit
         )
@@ -199,28 +377,41 @@ class AzureAISearchNotesService(NotesDbService):
         Returns:
             List[Note]: List of notes
         """
-        filter_str = f"userId eq '{user_id}'" if user_id else None
+        filter_str = _build_filter(user_id, None, None)
         
         results = await self.search_client.search(
             search_text="*",
             filter=filter_str,  
             top=limit,
             skip=offset,
-            orderby=["updatedAt desc"]
+            # Freshness scoring profile ranks newest-first without a
+            # global orderby sort on the service
+            scoring_profile="recent_boost"
         )   
         
         notes = []
         async for doc in results:
-            notes.append(self._doc_to_note(doc))
+            notes.append(self._doc_to_note_light(doc))
         return notes    
     
     
-    async def create_search_index(self, embedding_dimension: int = 1536) -> bool:
+    async def create_search_index(
+        self,
+        embedding_dimension: int = 1536,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        hnsw_ef_search: int = 100
+    ) -> bool:
         """
         Create the search index with appropriate field definitions for the Note model.
         
         Args:
             embedding_dimension: Dimension of the embedding vectors (default 1536 for OpenAI embeddings ada-02 and text-embedding-small)
+            hnsw_m: Bi-directional links per HNSW node. Larger values cost
+                more build time/storage but give better recall at lower ef_search.
+            hnsw_ef_construction: Candidate list size while building the graph
+            hnsw_ef_search: Candidate list size per query; query cost scales
+                roughly linearly with it
             
         Returns:
             bool: True if index creation was successful, False otherwise
@@ -233,9 +424,9 @@ class AzureAISearchNotesService(NotesDbService):
                         name="hnsw-config",
                         kind="hnsw",
                         hnsw_parameters=HnswParameters(
-                            m=4,  # Number of bi-directional links created for each new node
-                            ef_construction=400,  # Size of the dynamic candidate list for constructing the graph
-                            ef_search=500,  # Size of the dynamic candidate list for searching the graph
+                            m=hnsw_m,
+                            ef_construction=hnsw_ef_construction,
+                            ef_search=hnsw_ef_search,
                             metric="cosine"
                         )
                     )
@@ -243,8 +434,14 @@ class AzureAISearchNotesService(NotesDbService):
                 profiles=[
                     VectorSearchProfile(
                         name="embedding-profile",
-                        algorithm="hnsw-config"
+                        algorithm="hnsw-config",
+                        compression_name="sq8"
                     )
+                ],
+                compressions=[
+                    # int8 scalar quantization: ~4x smaller vectors in the
+                    # HNSW graph with near-identical recall
+                    ScalarQuantizationCompression(compression_name="sq8")
                 ]
             )
 
@@ -270,7 +467,7 @@ class AzureAISearchNotesService(NotesDbService):
                 SearchableField(name="summary", type=SearchFieldDataType.String, filterable=True),
                 SearchableField(
                     name="entities",
-                    type=SearchFieldDataType.String,
+                    type=SearchFieldDataType.Collection(SearchFieldDataType.String),
                     filterable=True,
                     facetable=True
                 ),
@@ -278,7 +475,10 @@ class AzureAISearchNotesService(NotesDbService):
                     name="embedding",
                     type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
                     vector_search_dimensions=embedding_dimension,
-                    vector_search_profile="embedding-profile"
+                    vector_search_profile="embedding-profile",
+                    # Vectors are only queried, never read back, so skip
+                    # storing the retrievable copy
+                    stored=False
                 ),
                 SimpleField(name="linkedNotes", type=SearchFieldDataType.String),
                 SimpleField(name="createdAt", type=SearchFieldDataType.DateTimeOffset),
@@ -286,24 +486,45 @@ class AzureAISearchNotesService(NotesDbService):
                 SimpleField(name="metadata", type=SearchFieldDataType.String)
             ]
 
+            # Boost recently updated notes so recency-ranked queries can use
+            # the scoring shortcut instead of a global sort
+            scoring_profiles = [
+                ScoringProfile(
+                    name="recent_boost",
+                    function_aggregation="sum",
+                    functions=[
+                        FreshnessScoringFunction(
+                            field_name="updatedAt",
+                            boost=10,
+                            interpolation="quadratic",
+                            parameters=FreshnessScoringParameters(boosting_duration="P30D")
+                        )
+                    ]
+                )
+            ]
+
             # Create the index
             index = SearchIndex(
                 name=self.index_name,
                 fields=fields,
-                vector_search=vector_search
+                vector_search=vector_search,
+                scoring_profiles=scoring_profiles
             )
             
             await self.index_client.create_index(index)
             return True
             
-        except Exception as e:
-            print(f"Error creating search index: {str(e)}")
+        except Exception:
+            logger.exception("Error creating search index")
             return False
         
         
         
     async def get_distinct_categories(self) -> Set[str]:
         """Get all distinct categories from the index."""
+        cached = self._get_cached_facet("categories")
+        if cached is not None:
+            return cached
         try:
             results = await self.search_client.search(
                 search_text="*",
@@ -315,14 +536,18 @@ class AzureAISearchNotesService(NotesDbService):
             categories = set()
             async for facet_result in results.facets.get("categories", []):
                 categories.add(facet_result["value"])
+            self._set_cached_facet("categories", categories)
             return categories
-        except Exception as e:
-            print(f"Error getting distinct categories: {str(e)}")
+        except Exception:
+            logger.exception("Error getting distinct categories")
             return set()
     
     
     async def get_distinct_tags(self) -> Set[str]:
         """Get all distinct tags from the index."""
+        cached = self._get_cached_facet("tags")
+        if cached is not None:
+            return cached
         try:
             results = await self.search_client.search(
                 search_text="*",
@@ -334,9 +559,10 @@ class AzureAISearchNotesService(NotesDbService):
             tags = set()
             async for facet_result in results.facets.get("tags", []):
                 tags.add(facet_result["value"])
+            self._set_cached_facet("tags", tags)
             return tags
-        except Exception as e:
-            print(f"Error getting distinct tags: {str(e)}")
+        except Exception:
+            logger.exception("Error getting distinct tags")
             return set()
         
         
@@ -365,7 +591,7 @@ class AzureAISearchNotesService(NotesDbService):
         if field in ["categories", "tags"]:
             filter_conditions.append(f"{field}/any(x: x eq '{value}')")
         elif field == "entities":
-            filter_conditions.append(f"search.in(entities, '{value}')")
+            filter_conditions.append(f"entities/any(e: e eq '{value}')")
         elif field == "summary":
             # For summary, we'll use search text instead of filter
             search_text = f"summary:{value}"
@@ -411,7 +637,7 @@ class AzureAISearchNotesService(NotesDbService):
             filter_conditions.append(f"userId eq '{user_id}'")
 
         # Build entity filter conditions
-        entity_conditions = [f"search.in(entities, '{entity}')" for entity in entities]
+        entity_conditions = [f"entities/any(e: e eq '{entity}')" for entity in entities]
         if entity_conditions:
             if match_all:
                 # All entities must be present
@@ -441,6 +667,9 @@ class AzureAISearchNotesService(NotesDbService):
         Returns:
             Set[str]: Set of unique entities
         """
+        cached = self._get_cached_facet("entities")
+        if cached is not None:
+            return cached
         try:
             results = await self.search_client.search(
                 search_text="*",
@@ -452,7 +681,8 @@ class AzureAISearchNotesService(NotesDbService):
             entities = set()
             async for facet_result in results.facets.get("entities", []):
                 entities.add(facet_result["value"])
+            self._set_cached_facet("entities", entities)
             return entities
-        except Exception as e:
-            print(f"Error getting distinct entities: {str(e)}")
+        except Exception:
+            logger.exception("Error getting distinct entities")
             return set()
\ No newline at end of file
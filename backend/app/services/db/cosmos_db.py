@@ -1,60 +1,477 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
+from functools import lru_cache
 import json
-from typing import Dict, Any, List, Optional, Tuple, Set
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Set
 import logging
 
+import aiohttp
+import numpy as np
 from azure.cosmos.aio import CosmosClient, ContainerProxy
 from azure.cosmos import PartitionKey
 from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
 from langchain_core.embeddings import Embeddings
+from pydantic import TypeAdapter
 
 from .base import NotesDbService
 from ...models.note import Note, NoteReference
-from ...models.content import FileContent, TextContent, LinkContent, ImageContent, VideoContent, AudioContent, ContentType, parse_content
+from ...models.content import ContentUnion, FileContent, TextContent, LinkContent, ImageContent, VideoContent, AudioContent, ContentType
+
+# The azure-cosmos SDK decodes response bodies with stdlib json, which is
+# the dominant CPU cost for pages of embedding-laden notes. The SDK exposes
+# no deserializer hook, so swap the json module referenced by its request
+# layer for orjson's SIMD parser; best effort only, since it reaches into
+# SDK internals that may move between releases.
+try:
+    import orjson
+    from azure.cosmos import _synchronized_request as _cosmos_sync_request
+    from azure.cosmos.aio import _asynchronous_request as _cosmos_async_request
+
+    class _OrjsonShim:
+        """stdlib-json-shaped facade over orjson for the Cosmos SDK."""
+
+        loads = staticmethod(orjson.loads)
+
+        @staticmethod
+        def dumps(obj, **kwargs) -> str:
+            return orjson.dumps(obj).decode()
+
+    for _module in (_cosmos_sync_request, _cosmos_async_request):
+        if getattr(_module, "json", None) is json:
+            _module.json = _OrjsonShim
+except ImportError:
+    pass
+
+
+logger = logging.getLogger(__name__)
+
+# Cached adapters so serialization runs once through pydantic-core instead
+# of a model_dump + json.dumps double walk per document
+_CONTENT_MAP_ADAPTER = TypeAdapter(Dict[str, ContentUnion])
+_LINKED_NOTES_ADAPTER = TypeAdapter(List[NoteReference])
+
+# Embeddings may arrive as Python lists or numpy arrays; the numpy path
+# avoids materializing 1536 boxed floats per vector
+EmbeddingLike = Any
+
+# Legacy documents carry only ISO timestamps; rows written in the same
+# second share the string, so memoizing the parse skips most of the work
+# on large result pages
+_parse_iso = lru_cache(maxsize=4096)(datetime.fromisoformat)
+
+
+def _quantize_embedding(embedding: EmbeddingLike) -> Tuple[List[int], float]:
+    """
+    Symmetric per-vector int8 quantization.
+
+    Returns the int8 values plus the scale needed to dequantize. Cosine
+    distance is scale-invariant, so per-vector scaling preserves ranking
+    while cutting stored/transferred embedding bytes 4x.
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    scale = float(np.abs(vector).max()) or 1.0
+    quantized = np.clip(np.rint(vector / scale * 127.0), -127, 127).astype(np.int8)
+    return quantized.tolist(), scale
+
+
+def _dequantize_embedding(values: List[int], scale: float) -> List[float]:
+    """Inverse of _quantize_embedding."""
+    return (np.asarray(values, dtype=np.float32) * (scale / 127.0)).tolist()
+
+
+@lru_cache(maxsize=64)
+def _predicate_template(
+    has_user: bool,
+    has_categories: bool,
+    has_tags: bool,
+    has_entities: bool,
+    text_mode: Optional[str]
+) -> str:
+    """
+    Memoized SQL fragment for a given filter shape.
+
+    Only the shape (which filters are active) varies the SQL; the actual
+    values always travel as parameters, so the joined string can be cached
+    per shape. Tag and entity lists bind as single array parameters, so the
+    SQL does not grow with the list length and the plan cache stays warm.
+    """
+    clauses = []
+    if has_user:
+        clauses.append("c.userId = @userId")
+    if has_categories:
+        clauses.append("ARRAY_CONTAINS(c.categories, @category)")
+    if has_tags:
+        clauses.append("EXISTS(SELECT VALUE t FROM t IN c.tags WHERE ARRAY_CONTAINS(@tagArr, t))")
+    if has_entities:
+        clauses.append("EXISTS(SELECT VALUE e FROM e IN c.entities WHERE ARRAY_CONTAINS(@entityArr, e))")
+    if text_mode == "full":
+        # Match against the pre-lowered shadow fields written by
+        # _note_to_doc; @searchText arrives already lowercased, so no
+        # per-row LOWER() calls defeat the range indexes
+        search_conditions = [
+            "CONTAINS(c.contentLower, @searchText)",
+            "CONTAINS(c.titleLower, @searchText)",
+            "CONTAINS(c.summaryLower, @searchText)",
+            "ARRAY_CONTAINS(c.tagsLower, @searchText)",
+            "ARRAY_CONTAINS(c.categoriesLower, @searchText)",
+            "ARRAY_CONTAINS(c.entitiesLower, @searchText)"
+        ]
+        clauses.append("({})".format(" OR ".join(search_conditions)))
+    elif text_mode == "content":
+        clauses.append("CONTAINS(c.content, @queryText)")
+    return (" AND " + " AND ".join(clauses)) if clauses else ""
+
+
+@lru_cache(maxsize=32)
+def _projection(fields: Optional[Tuple[str, ...]]) -> str:
+    """SELECT list for a projected query; '*' when no fields are given."""
+    if not fields:
+        return "*"
+    return ", ".join(f"c.{field}" for field in fields)
+
+
+@lru_cache(maxsize=64)
+def _search_notes_sql(clause: str, projection: str = "*") -> str:
+    """Canonical search_notes SQL per filter shape (clause is memoized too)."""
+    return f"SELECT {projection} FROM c WHERE c.type = 'note'" + clause
+
+
+# vector_search has no dynamic structure, so its SQL is parsed exactly once.
+# The similarity is projected in a subquery so the server computes the
+# distance a single time per document instead of once for the SELECT and
+# again for the WHERE.
+_VECTOR_SEARCH_SQL = """
+SELECT x.c, x.similarity
+FROM (
+    SELECT c,
+    vector_cosine_similarity(c.embedding, @queryEmbedding) AS similarity
+    FROM c
+    WHERE c.type = 'note'
+) x
+WHERE x.similarity >= @minSimilarity
+ORDER BY x.similarity DESC
+OFFSET 0 LIMIT @limit
+"""
+
+
+@lru_cache(maxsize=128)
+def _hybrid_search_sql(inner_filter: str, outer_filter: str, fetch_limit: int) -> str:
+    """Hybrid-search SQL, memoized per filter shape and fetch limit."""
+    return """
+        SELECT x.c, x.similarity
+        FROM (
+            SELECT c,
+            (1 - VectorDistance(c.embedding, @queryEmbedding, 'cosine')) AS similarity
+            FROM c
+            WHERE c.type = 'note'{inner_filter}
+        ) x
+        WHERE x.similarity >= @minSimilarity{outer_filter}
+        ORDER BY x.similarity DESC
+        OFFSET 0 LIMIT {limit}
+    """.format(inner_filter=inner_filter, outer_filter=outer_filter, limit=fetch_limit)
+
+
+@lru_cache(maxsize=8)
+def _recent_notes_sql(has_user: bool, projection: str = "*") -> str:
+    """Canonical get_recent_notes SQL, one variant per filter shape."""
+    query = f"SELECT {projection} FROM c WHERE c.type = 'note'"
+    if has_user:
+        query += " AND c.userId = @userId"
+    # Order by the ISO string, not the updatedAtTs twin: Cosmos drops
+    # documents that lack the ORDER BY property, and documents written
+    # before the twin existed have no updatedAtTs. ISO-8601 sorts
+    # chronologically, so the result is the same once a backfill lands.
+    return query + " ORDER BY c.updatedAt DESC OFFSET @offset LIMIT @limit"
+
+
+@lru_cache(maxsize=4)
+def _recent_notes_page_sql(has_user: bool) -> str:
+    """get_recent_notes_page SQL; no OFFSET, pagination is token-based."""
+    query = "SELECT * FROM c WHERE c.type = 'note'"
+    if has_user:
+        query += " AND c.userId = @userId"
+    # Same legacy-document caveat as _recent_notes_sql
+    return query + " ORDER BY c.updatedAt DESC"
+
+
+def _build_predicates(
+    user_id: Optional[str] = None,
+    categories: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    entities: Optional[List[str]] = None,
+    search_text: Optional[str] = None,
+    text_mode: Optional[str] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Shared filter builder for search_notes / hybrid_search."""
+    clause = _predicate_template(
+        bool(user_id),
+        bool(categories),
+        bool(tags),
+        bool(entities),
+        text_mode if search_text else None
+    )
+    params: List[Dict[str, Any]] = []
+    if user_id:
+        params.append({"name": "@userId", "value": user_id})
+    if categories:
+        params.append({"name": "@category", "value": categories})
+    if tags:
+        params.append({"name": "@tagArr", "value": list(tags)})
+    if entities:
+        params.append({"name": "@entityArr", "value": list(entities)})
+    if search_text:
+        if text_mode == "full":
+            # Lowercase once here instead of LOWER() per row server-side
+            params.append({"name": "@searchText", "value": search_text.lower()})
+        else:
+            params.append({"name": "@queryText", "value": search_text})
+    return clause, params
 
 
 class CosmosDBNotesService(NotesDbService):
+    # hybrid_search plan selection: filters matching less than this fraction
+    # of notes are treated as selective and evaluated before the vector
+    # distance; broader filters are applied after an over-fetched
+    # similarity pass
+    PREFILTER_SELECTIVITY = 0.01
+    # How long COUNT-based selectivity estimates are reused
+    COUNT_CACHE_TTL_SECONDS = 300
+    # Point-read cache: linked-note traversal and UI fetches hit the same
+    # notes repeatedly within a short window
+    NOTE_CACHE_TTL_SECONDS = 30
+    NOTE_CACHE_MAX_SIZE = 10_000
+    # Repeated identical vector/hybrid queries (e.g. within a user session)
+    # are served from memory instead of re-running the RU-heavy query
+    RESULT_CACHE_TTL_SECONDS = 60
+    RESULT_CACHE_MAX_SIZE = 2048
+    # Query-text -> embedding LRU: repeat searches skip the embedding model
+    # entirely (~6 MB at 1000 x 1536 float32)
+    EMBEDDING_CACHE_MAX_SIZE = 1000
+    # Projection for list views: everything a listing renders, without the
+    # embedding (~6 KB/doc) and contentMap payloads
+    LIST_FIELDS = (
+        "id", "userId", "title", "summary", "tags", "categories",
+        "entities", "entityMap", "createdAt", "updatedAt",
+        "createdAtTs", "updatedAtTs", "metadata"
+    )
+
     def __init__(
         self,
         endpoint: str,
         database_name: str,
         container_name: str,
         credential: str,
-        embeddings: Embeddings
+        embeddings: Embeddings,
+        alpha: float = 3.0
     ):
-        self.client = CosmosClient(endpoint, credential)
+        # Tuned transport: the SDK's default aiohttp session has a small
+        # connection pool and a short keepalive window, so concurrent
+        # search/get_note calls serialize on sockets and idle gaps pay
+        # fresh TLS handshakes
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=256,
+                limit_per_host=128,
+                keepalive_timeout=300,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True
+            )
+        )
+        self._transport = AioHttpTransport(session=self._session, session_owner=False)
+        self.client = CosmosClient(
+            endpoint,
+            credential,
+            transport=self._transport,
+            connection_timeout=5,
+            read_timeout=30
+        )
         self.database = self.client.get_database_client(database_name)
         self.container = self.database.get_container_client(container_name)
         self.embeddings = embeddings
+        # Over-fetch factor for the post-filter hybrid_search plan
+        self.alpha = alpha
+        # (filter sql, param values) -> (fetched_at, selectivity)
+        self._selectivity_cache: Dict[Any, Tuple[float, float]] = {}
+        # note_id -> (fetched_at, Note); stores the converted Note so cache
+        # hits skip both the round trip and _doc_to_note
+        self._note_cache: Dict[str, Tuple[float, Note]] = {}
+        # (write generation, query fingerprint) -> (fetched_at, results)
+        self._result_cache: Dict[Any, Tuple[float, Any]] = {}
+        # Bumped on every write; coarse-grained invalidation of cached
+        # search results
+        self._write_generation = 0
+        # query text -> embedding; embeddings never go stale, so plain LRU
+        self._embedding_cache: Dict[str, List[float]] = {}
+
+    async def close(self) -> None:
+        """Close the Cosmos client and the shared aiohttp session."""
+        await self.client.close()
+        await self._session.close()
+
+    async def _embed_query(self, text: str) -> List[float]:
+        """aembed_query with an LRU cache keyed by the query text."""
+        embedding = self._embedding_cache.pop(text, None)
+        if embedding is None:
+            embedding = await self.embeddings.aembed_query(text)
+            if len(self._embedding_cache) >= self.EMBEDDING_CACHE_MAX_SIZE:
+                self._embedding_cache.pop(next(iter(self._embedding_cache)))
+        # (Re)insert so the entry moves to the fresh end of the dict
+        self._embedding_cache[text] = embedding
+        return embedding
+
+    @staticmethod
+    def _embedding_fingerprint(embedding) -> int:
+        """Stable hash of an embedding's float32 byte buffer."""
+        return hash(np.asarray(embedding, dtype=np.float32).tobytes())
+
+    def _get_cached_result(self, key) -> Optional[Any]:
+        cached = self._result_cache.get(key)
+        if cached and (time.monotonic() - cached[0]) < self.RESULT_CACHE_TTL_SECONDS:
+            return cached[1]
+        return None
+
+    def _set_cached_result(self, key, value) -> None:
+        if len(self._result_cache) >= self.RESULT_CACHE_MAX_SIZE:
+            self._result_cache.pop(next(iter(self._result_cache)))
+        self._result_cache[key] = (time.monotonic(), value)
+
+    async def _count_notes(self, meta_filter: str = "", params: Optional[List[Dict[str, Any]]] = None) -> int:
+        query = "SELECT VALUE COUNT(1) FROM c WHERE c.type = 'note'" + meta_filter
+        async for count in self.container.query_items(query=query, parameters=params or []):
+            return count
+        return 0
+
+    async def _estimate_selectivity(self, meta_filter: str, params: List[Dict[str, Any]]) -> float:
+        """
+        Estimate the fraction of notes matched by the metadata filter,
+        cached with a TTL since the counts only need to be approximate.
+        """
+        key = (meta_filter, tuple(sorted((p["name"], str(p["value"])) for p in params)))
+        cached = self._selectivity_cache.get(key)
+        if cached and (time.monotonic() - cached[0]) < self.COUNT_CACHE_TTL_SECONDS:
+            return cached[1]
+        total = await self._count_notes()
+        matched = await self._count_notes(meta_filter, params)
+        selectivity = (matched / total) if total else 1.0
+        self._selectivity_cache[key] = (time.monotonic(), selectivity)
+        return selectivity
         
     def _note_to_doc(self, note: Note) -> Dict[str, Any]:
         """Convert Note to Cosmos DB document"""
+        embedding, embedding_scale = (None, None)
+        if note.embedding is not None:
+            embedding, embedding_scale = _quantize_embedding(note.embedding)
         return {
             "id": note.note_id,
             "userId": note.user_id,
             "content": note.content,
-            "contentMap": json.dumps({k: v.model_dump() for k, v in note.content_map.items()}) if note.content_map else None,
+            # Pre-lowered shadow fields so text search can hit the range
+            # indexes instead of computing LOWER() per row
+            "contentLower": note.content.lower() if note.content else None,
+            "titleLower": note.title.lower() if note.title else None,
+            "summaryLower": note.summary.lower() if note.summary else None,
+            "contentMap": _CONTENT_MAP_ADAPTER.dump_python(note.content_map, mode="json") if note.content_map else None,
             "categories": note.categories,
             "title": note.title,
             "tags": note.tags,
             "summary": note.summary,
-            "entities": note.entities,
-            "embedding": note.embedding,
-            "linkedNotes": [ref.model_dump() for ref in note.linked_notes],
+            # Lowercased twins of the array fields so case-insensitive text
+            # search matches without mangling the display casing
+            "tagsLower": [tag.lower() for tag in note.tags] if note.tags else [],
+            "categoriesLower": [cat.lower() for cat in note.categories] if note.categories else [],
+            "entitiesLower": [name.lower() for name in note.entities] if note.entities else [],
+            # Entity names as an array so ARRAY_CONTAINS / JOIN work against
+            # them; the name -> type mapping rides along separately
+            "entities": list(note.entities) if note.entities else [],
+            "entityMap": note.entities,
+            "embedding": embedding,
+            "embeddingScale": embedding_scale,
+            "linkedNotes": _LINKED_NOTES_ADAPTER.dump_python(note.linked_notes, mode="json"),
             "createdAt": note.created_at.isoformat(),
             "updatedAt": note.updated_at.isoformat(),
+            # Epoch-millis twins: numeric, so cheaper to index, sort and
+            # parse than the ISO strings (kept above for older readers)
+            "createdAtTs": int(note.created_at.timestamp() * 1000),
+            "updatedAtTs": int(note.updated_at.timestamp() * 1000),
             "metadata": note.metadata,
             "type": "note"  # Document type for filtering
         }
 
+    @staticmethod
+    def _doc_entities(doc: Dict[str, Any]) -> Dict[str, str]:
+        """Rebuild the entities dict from a document."""
+        entity_map = doc.get("entityMap")
+        if entity_map is not None:
+            return entity_map
+        entities = doc.get("entities")
+        if isinstance(entities, dict):
+            # Documents written before entities became an array
+            return entities
+        return {name: "" for name in entities or []}
+
+    @staticmethod
+    def _doc_datetime(doc: Dict[str, Any], field: str) -> datetime:
+        """Read a timestamp, preferring the numeric epoch-millis twin."""
+        ts = doc.get(field + "Ts")
+        if ts is not None:
+            return datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+        return _parse_iso(doc[field])
+
+    def _docs_to_notes(self, docs: List[Dict[str, Any]], shallow: bool = False) -> List[Note]:
+        """Convert one page of documents; pure CPU, safe to run off-loop."""
+        convert = self._doc_to_note_shallow if shallow else self._doc_to_note
+        return [convert(doc) for doc in docs]
+
+    def _doc_to_note_shallow(self, doc: Dict[str, Any]) -> Note:
+        """
+        Build a Note from a projected document.
+
+        Fields left out of the projection (embedding, contentMap, content)
+        come back empty rather than failing, so list views can skip the
+        heavy payloads entirely.
+        """
+        has_created = "createdAt" in doc or "createdAtTs" in doc
+        has_updated = "updatedAt" in doc or "updatedAtTs" in doc
+        return Note.model_construct(
+            note_id=doc["id"],
+            user_id=doc.get("userId"),
+            content=doc.get("content"),
+            content_map={},
+            categories=doc.get("categories", []),
+            title=doc.get("title"),
+            tags=doc.get("tags", []),
+            summary=doc.get("summary"),
+            entities=self._doc_entities(doc),
+            embedding=None,
+            linked_notes=[],
+            created_at=self._doc_datetime(doc, "createdAt") if has_created else None,
+            updated_at=self._doc_datetime(doc, "updatedAt") if has_updated else None,
+            metadata=doc.get("metadata", {})
+        )
+
     def _doc_to_note(self, doc: Dict[str, Any]) -> Note:
-        """Convert Cosmos DB document back to Note"""
-        content_map = {}
-        if doc.get("contentMap"):
-            raw_map = json.loads(doc["contentMap"])
-            for key, val in raw_map.items():
-                content_map[key] = parse_content(val)
-        return Note(
+        """
+        Convert Cosmos DB document back to Note.
+
+        Documents come from our own write path, so the models are built with
+        model_construct and skip the full validation pipeline — roughly an
+        order of magnitude cheaper than Note(...) per row on large result
+        pages.
+        """
+        raw_map = doc.get("contentMap")
+        if not raw_map:
+            content_map = {}
+        elif isinstance(raw_map, str):
+            # Documents written before contentMap became a nested object
+            content_map = _CONTENT_MAP_ADAPTER.validate_json(raw_map)
+        else:
+            content_map = _CONTENT_MAP_ADAPTER.validate_python(raw_map)
+        embedding = doc.get("embedding")
+        if embedding is not None and doc.get("embeddingScale") is not None:
+            embedding = _dequantize_embedding(embedding, doc["embeddingScale"])
+        return Note.model_construct(
             note_id=doc["id"],
             user_id=doc.get("userId"),
             content=doc.get("content"),
@@ -63,37 +480,166 @@ class CosmosDBNotesService(NotesDbService):
             title=doc.get("title"),
             tags=doc.get("tags", []),
             summary=doc.get("summary"),
-            entities=doc.get("entities", {}),
-            embedding=doc.get("embedding"),
-            linked_notes=[NoteReference(**ref) for ref in doc.get("linkedNotes", [])],
-            created_at=datetime.fromisoformat(doc["createdAt"]),
-            updated_at=datetime.fromisoformat(doc["updatedAt"]),
+            entities=self._doc_entities(doc),
+            embedding=embedding,
+            linked_notes=[NoteReference.model_construct(**ref) for ref in doc.get("linkedNotes", [])],
+            created_at=self._doc_datetime(doc, "createdAt"),
+            updated_at=self._doc_datetime(doc, "updatedAt"),
             metadata=doc.get("metadata", {})
         )
 
     async def create_note(self, note: Note, user_id: Optional[str] = None) -> Note:
         doc = self._note_to_doc(note)
         await self.container.create_item(doc)
+        self._write_generation += 1
         return note
 
+    async def create_notes(
+        self,
+        notes: List[Note],
+        user_id: Optional[str] = None,
+        max_concurrency: int = 32
+    ) -> List[Any]:
+        """
+        Bulk-create notes with bounded concurrency.
+
+        The container is partitioned on /id, so each note lives in its own
+        logical partition and a transactional batch cannot span them;
+        instead the round trips are overlapped with a semaphore-gated
+        asyncio.gather. Returns one result per note, in order, with
+        exceptions in place of failed inserts.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def create(note: Note):
+            async with semaphore:
+                return await self.create_note(note, user_id=user_id)
+
+        return await asyncio.gather(*(create(note) for note in notes), return_exceptions=True)
+
     async def get_note(self, note_id: str, user_id: Optional[str] = None) -> Optional[Note]:
+        cached = self._note_cache.get(note_id)
+        if cached and (time.monotonic() - cached[0]) < self.NOTE_CACHE_TTL_SECONDS:
+            return cached[1]
         try:
             doc = await self.container.read_item(note_id, partition_key=note_id)
-            return self._doc_to_note(doc)
         except CosmosResourceNotFoundError:
             return None
+        note = self._doc_to_note(doc)
+        if len(self._note_cache) >= self.NOTE_CACHE_MAX_SIZE:
+            # Dict preserves insertion order, so this evicts the oldest entry
+            self._note_cache.pop(next(iter(self._note_cache)))
+        self._note_cache[note_id] = (time.monotonic(), note)
+        return note
 
-    async def update_note(self, note: Note, user_id: Optional[str] = None) -> bool:
+    async def update_note(
+        self,
+        note: Note,
+        user_id: Optional[str] = None,
+        changed_fields: Optional[Iterable[str]] = None
+    ) -> bool:
+        """
+        Persist an updated note.
+
+        Callers that know which fields they touched can pass changed_fields
+        to patch just those instead of re-uploading the whole document —
+        for a metadata edit that avoids re-serializing the embedding and
+        contentMap entirely. Embedding and contentMap changes, or edits too
+        wide for one patch request, fall back to a full replace.
+        """
+        changed = set(changed_fields) if changed_fields else None
+        if changed and not changed & {"note_id", "embedding", "content_map"}:
+            changed.add("updated_at")
+            ops = self._patch_ops({field: getattr(note, field) for field in changed})
+            # Cosmos caps a patch request at 10 operations
+            if len(ops) <= 10:
+                try:
+                    await self.container.patch_item(
+                        item=note.note_id,
+                        partition_key=note.note_id,
+                        patch_operations=ops
+                    )
+                except CosmosResourceNotFoundError:
+                    return False
+                self._note_cache.pop(note.note_id, None)
+                self._write_generation += 1
+                return True
         try:
             doc = self._note_to_doc(note)
             await self.container.replace_item(note.note_id, doc)
+            self._note_cache.pop(note.note_id, None)
+            self._write_generation += 1
             return True
         except CosmosResourceNotFoundError:
             return False
 
+    # Note field -> document field for patch paths
+    _PATCH_FIELD_MAP = {
+        "user_id": "userId",
+        "content_map": "contentMap",
+        "linked_notes": "linkedNotes",
+        "created_at": "createdAt",
+        "updated_at": "updatedAt",
+    }
+
+    def _patch_ops(self, fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        JSON-Patch operations for the given note fields, including the
+        derived document fields (epoch-millis twins, lowercase shadow
+        fields, the entities array/map pair) so patched documents stay
+        consistent with full writes.
+        """
+        ops = []
+        for field, value in fields.items():
+            doc_field = self._PATCH_FIELD_MAP.get(field, field)
+            if isinstance(value, datetime):
+                ops.append({"op": "set", "path": f"/{doc_field}Ts", "value": int(value.timestamp() * 1000)})
+                value = value.isoformat()
+            elif doc_field in ("content", "title", "summary"):
+                ops.append({"op": "set", "path": f"/{doc_field}Lower", "value": value.lower() if value else None})
+            elif doc_field in ("tags", "categories"):
+                ops.append({"op": "set", "path": f"/{doc_field}Lower", "value": [v.lower() for v in value] if value else []})
+            elif field == "entities":
+                ops.append({"op": "set", "path": "/entityMap", "value": value})
+                ops.append({"op": "set", "path": "/entitiesLower", "value": [name.lower() for name in value] if value else []})
+                value = list(value) if value else []
+            ops.append({"op": "set", "path": f"/{doc_field}", "value": value})
+        return ops
+
+    async def patch_note(
+        self,
+        note_id: str,
+        fields: Dict[str, Any],
+        user_id: Optional[str] = None
+    ) -> bool:
+        """
+        Partially update a note with Cosmos JSON-Patch operations.
+
+        For metadata-only edits this sends just the changed fields instead
+        of re-uploading the whole document (including the embedding), which
+        shrinks the payload by orders of magnitude and costs far fewer RUs
+        than replace_item.
+        """
+        ops = self._patch_ops(fields)
+        if not ops:
+            return True
+        try:
+            await self.container.patch_item(
+                item=note_id,
+                partition_key=note_id,
+                patch_operations=ops
+            )
+        except CosmosResourceNotFoundError:
+            return False
+        self._note_cache.pop(note_id, None)
+        self._write_generation += 1
+        return True
+
     async def delete_note(self, note_id: str, user_id: Optional[str] = None) -> bool:
         try:
             await self.container.delete_item(note_id, partition_key=note_id)
+            self._note_cache.pop(note_id, None)
+            self._write_generation += 1
             return True
         except CosmosResourceNotFoundError:
             return False
@@ -104,95 +650,88 @@ class CosmosDBNotesService(NotesDbService):
         categories: Optional[str] = None,
         tags: Optional[List[str]] = None,
         search_text: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        fields: Optional[Iterable[str]] = None
     ) -> List[Note]:
-        query_parts = ["SELECT * FROM c WHERE 1=1 AND c.type = 'note'"]
-        params = []
-
-        if user_id:
-            query_parts.append("AND c.userId = @userId")
-            params.append({"name": "@userId", "value": user_id})
+        clause, params = _build_predicates(
+            user_id=user_id,
+            categories=categories,
+            tags=tags,
+            search_text=search_text,
+            text_mode="full"
+        )
+        fields = tuple(fields) if fields else None
+        query = _search_notes_sql(clause, _projection(fields))
 
-        if categories:
-            query_parts.append("AND ARRAY_CONTAINS(c.categories, @category)")
-            params.append({"name": "@category", "value": categories})
-
-        if tags:
-            tag_conditions = []
-            for i, tag in enumerate(tags):
-                param_name = f"@tag{i}"
-                tag_conditions.append(f"ARRAY_CONTAINS(c.tags, {param_name})")
-                params.append({"name": param_name, "value": tag})
-            query_parts.append(f"AND ({' OR '.join(tag_conditions)})")
-
-        if search_text:
-            search_conditions = [
-                "CONTAINS(LOWER(c.content), LOWER(@searchText))",
-                "CONTAINS(LOWER(c.title), LOWER(@searchText))",
-                "CONTAINS(LOWER(c.summary), LOWER(@searchText))",
-                "ARRAY_CONTAINS(c.tags, LOWER(@searchText))",  # Use ARRAY_CONTAINS for tags
-                "ARRAY_CONTAINS(c.categories, LOWER(@searchText))",  # Use ARRAY_CONTAINS for categories
-                "ARRAY_CONTAINS(c.entities, LOWER(@searchText))"  # Use ARRAY_CONTAINS for entities
-            ]
-            query_parts.append(f"AND ({' OR '.join(search_conditions)})")
-            params.append({"name": "@searchText", "value": search_text})
-
-        query = " ".join(query_parts)
-
-        print(query)
-        notes = []
+        logger.debug("cosmos search query: %s", query)
+        docs = []
         try:
+            # Collect raw docs while the cursor streams and convert after it
+            # completes: the conversion is pure Python-level work and doing
+            # it per row blocks the generator between pages
             async for doc in self.container.query_items(
                 query=query,
                 parameters=params,
-                max_item_count=limit
+                # One page per request where possible instead of the
+                # 100-item default forcing continuation round trips
+                max_item_count=min(limit, 1000)
             ):
-                notes.append(self._doc_to_note(doc))
-        except Exception as e:
-            print(f"Error searching notes: {str(e)}")
-        return notes
+                docs.append(doc)
+        except Exception:
+            logger.exception("search_notes failed")
+        return self._docs_to_notes(docs, shallow=fields is not None)
 
     async def vector_search(
         self,
         query: Optional[str],
-        query_embedding: List[float],
+        query_embedding: EmbeddingLike,
         limit: int = 10,
         min_similarity: float = 0.7,
         user_id: Optional[str] = None
     ) -> List[Tuple[Note, float]]:
-        query = """
-        SELECT *,
-        vector_cosine_similarity(c.embedding, @queryEmbedding) as similarity
-        FROM c
-        WHERE c.type = 'note'
-        AND vector_cosine_similarity(c.embedding, @queryEmbedding) >= @minSimilarity
-        ORDER BY similarity DESC
-        OFFSET 0 LIMIT @limit
-        """
-        
         if query:
-            query_embedding = await self.embeddings.aembed_query(query)
+            query_embedding = await self._embed_query(query)
         
+        cache_key = (
+            self._write_generation,
+            "vector",
+            self._embedding_fingerprint(query_embedding),
+            min_similarity,
+            limit
+        )
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            return cached
+
+        # Query vectors must be quantized the same way as stored vectors
+        query_embedding, _ = _quantize_embedding(query_embedding)
+
         params = [
             {"name": "@queryEmbedding", "value": query_embedding},
             {"name": "@minSimilarity", "value": min_similarity},
             {"name": "@limit", "value": limit}
         ]
 
-        notes_with_scores = []
-        async for doc in self.container.query_items(
-            query=query,
+        # Drain the cursor first, convert second, so per-row conversion work
+        # never sits between page fetches
+        rows = []
+        async for row in self.container.query_items(
+            query=_VECTOR_SEARCH_SQL,
             parameters=params,
-            enable_scan_in_query=True  # Required for vector search
+            max_item_count=min(limit, 1000)
         ):
-            score = doc.pop('similarity')
-            notes_with_scores.append((self._doc_to_note(doc), score))
+            rows.append(row)
+        notes_with_scores = [
+            (note, row["similarity"])
+            for note, row in zip(self._docs_to_notes([row["c"] for row in rows]), rows)
+        ]
+        self._set_cached_result(cache_key, notes_with_scores)
         return notes_with_scores
 
     async def hybrid_search(
         self,
         query_text: Optional[str] = None,
-        query_embedding: Optional[List[float]] = None,
+        query_embedding: Optional[EmbeddingLike] = None,
         user_id: Optional[str] = None,
         categories: Optional[str] = None,
         tags: Optional[List[str]] = None,
@@ -209,158 +748,174 @@ class CosmosDBNotesService(NotesDbService):
             raise ValueError("Either query_text or query_embedding must be provided")
             
         if query_text and not query_embedding:
-            query_embedding = await self.embeddings.aembed_query(query_text)
+            query_embedding = await self._embed_query(query_text)
 
-        # Ensure query_embedding is a list 
-        query_embedding = list(query_embedding)
-        
-        # Build base query with vector distance calculation
-        query = """
-            SELECT *,
-            (1 - VectorDistance(c.embedding, @queryEmbedding, 'cosine')) as similarity
-            FROM c
-            WHERE c.type = 'note'
-        """
-        
-        params = []
+        cache_key = (
+            self._write_generation,
+            "hybrid",
+            self._embedding_fingerprint(query_embedding),
+            query_text,
+            user_id,
+            categories,
+            tuple(tags) if tags else None,
+            tuple(entities) if entities else None,
+            min_similarity,
+            limit
+        )
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            return cached
 
-        # Add filters
-        conditions = []
+        # Query vectors must be quantized the same way as stored vectors
+        query_embedding, _ = _quantize_embedding(query_embedding)
         
-        if user_id:
-            conditions.append("c.userId = @userId")
-            params.append({"name": "@userId", "value": user_id})
-            
-        if categories:
-            conditions.append("ARRAY_CONTAINS(c.categories, @category)")
-            params.append({"name": "@category", "value": categories})
-
-        if tags:
-            tag_parts = []
-            for i, tag in enumerate(tags):
-                tag_parts.append(f"ARRAY_CONTAINS(c.tags, @tag{i})")
-                params.append({"name": f"@tag{i}", "value": tag})
-            if tag_parts:
-                conditions.append(f"({' OR '.join(tag_parts)})")
-
-        if entities:
-            entity_parts = []
-            for i, entity in enumerate(entities):
-                entity_parts.append(f"ARRAY_CONTAINS(c.entities, @entity{i})")
-                params.append({"name": f"@entity{i}", "value": entity})
-            if entity_parts:
-                conditions.append(f"({' OR '.join(entity_parts)})")
-
-        if query_text:
-            conditions.append("CONTAINS(c.content, @queryText)")
-            params.append({"name": "@queryText", "value": query_text})
-
-        # Add vector similarity condition using correct distance function
-        conditions.append("(1 - VectorDistance(c.embedding, @queryEmbedding, 'cosine')) >= @minSimilarity")
-        params.extend([
+        # Metadata filters, applied inside the subquery
+        meta_filter, meta_params = _build_predicates(
+            user_id=user_id,
+            categories=categories,
+            tags=tags,
+            entities=entities,
+            search_text=query_text,
+            text_mode="content"
+        )
+
+        params = meta_params + [
             {"name": "@queryEmbedding", "value": query_embedding},
             {"name": "@minSimilarity", "value": min_similarity}
-        ])
+        ]
 
-        # Add conditions to query
-        if conditions:
-            query += " AND " + " AND ".join(conditions)
+        # Plan selection: selective filters go inside the subquery so the
+        # distance is only computed over the filtered rows (pre-filter);
+        # broad filters are applied after the similarity ranking over an
+        # over-fetched candidate pool (post-filter)
+        inner_filter = ""
+        outer_filter = ""
+        fetch_limit = int(limit)
+        if meta_filter:
+            selectivity = await self._estimate_selectivity(meta_filter, meta_params)
+            if selectivity <= self.PREFILTER_SELECTIVITY:
+                inner_filter = meta_filter
+            else:
+                outer_filter = meta_filter.replace("c.", "x.c.")
+                fetch_limit = int(limit * self.alpha)
 
-        # Add ordering and limit - use direct integer for LIMIT
-        query += """
-            ORDER BY similarity DESC
-            OFFSET 0 LIMIT {}
-        """.format(int(limit))
+        query = _hybrid_search_sql(inner_filter, outer_filter, fetch_limit)
 
-        # Execute query with proper error handling
-        notes = []
+        # Execute query with proper error handling; raw docs are collected
+        # while the cursor streams and converted in one pass afterwards
+        docs = []
         try:
-            async for doc in self.container.query_items(
+            async for row in self.container.query_items(
                 query=query,
                 parameters=params,
-                enable_scan_in_query=True
+                max_item_count=min(fetch_limit, 1000)
             ):
-                notes.append(self._doc_to_note(doc))
-        except Exception as e:
-            logging.error("Vector search query failed")
-            logging.error(f"Query: {query}")
-            logging.error(f"Parameters: {params}")
-            logging.exception(e)
+                docs.append(row["c"])
+        except Exception:
+            logger.exception("hybrid_search failed; query=%s params=%s", query, params)
             raise
 
+        notes = self._docs_to_notes(docs[:limit])
+        self._set_cached_result(cache_key, notes)
         return notes
 
     async def get_recent_notes(
         self,
         user_id: Optional[str] = None,
         offset: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        fields: Optional[Iterable[str]] = None
     ) -> List[Note]:
-        query_parts = ["SELECT * FROM c WHERE c.type = 'note'"]
+        fields = tuple(fields) if fields else None
+        query = _recent_notes_sql(bool(user_id), _projection(fields))
         params = []
-
         if user_id:
-            query_parts.append("AND c.userId = @userId")
             params.append({"name": "@userId", "value": user_id})
-
-        query_parts.extend([
-            "ORDER BY c.updatedAt DESC",
-            "OFFSET @offset LIMIT @limit"
-        ])
-        
         params.extend([
             {"name": "@offset", "value": offset},
             {"name": "@limit", "value": limit}
         ])
-
-        query = " ".join(query_parts)
         
-        notes = []
-        async for doc in self.container.query_items(
+        # Convert each page off the event loop while the next page is being
+        # fetched; for large limits the pydantic/datetime work per row would
+        # otherwise starve other requests
+        conversions = []
+        pages = self.container.query_items(
             query=query,
-            parameters=params
-        ):
-            notes.append(self._doc_to_note(doc))
-        return notes
+            parameters=params,
+            max_item_count=min(limit, 1000)
+        ).by_page()
+        async for page in pages:
+            docs = [doc async for doc in page]
+            conversions.append(asyncio.create_task(
+                asyncio.to_thread(self._docs_to_notes, docs, fields is not None)
+            ))
+        return [note for chunk in await asyncio.gather(*conversions) for note in chunk]
 
-    async def get_distinct_categories(self, user_id: Optional[str] = None) -> Set[str]:
-        query = """
-        SELECT DISTINCT VALUE c.category
-        FROM c
-        JOIN category IN c.categories
-        WHERE c.type = 'note'
+    async def get_recent_notes_page(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 10,
+        continuation_token: Optional[str] = None
+    ) -> Tuple[List[Note], Optional[str]]:
         """
-        
-        categories = set()
-        async for result in self.container.query_items(query, enable_cross_partition_query=True):
-            categories.add(result)
-        return categories
+        Token-paginated variant of get_recent_notes.
 
-    async def get_distinct_tags(self, user_id: Optional[str] = None) -> Set[str]:
-        query = """
-        SELECT DISTINCT VALUE t
-        FROM c
-        JOIN t IN c.tags
-        WHERE c.type = 'note'
+        OFFSET/LIMIT pagination makes the server read and discard every
+        earlier row, so RU cost grows linearly with page depth; resuming
+        from a continuation token keeps each page at constant cost. Returns
+        the page plus the token for the next one (None when exhausted).
         """
-        
-        tags = set()
-        async for result in self.container.query_items(query, enable_cross_partition_query=True):
-            tags.add(result)
-        return tags
+        query = _recent_notes_page_sql(bool(user_id))
+        params = [{"name": "@userId", "value": user_id}] if user_id else []
+        pages = self.container.query_items(
+            query=query,
+            parameters=params,
+            max_item_count=min(limit, 1000)
+        ).by_page(continuation_token)
+        async for page in pages:
+            docs = [doc async for doc in page]
+            return self._docs_to_notes(docs), pages.continuation_token
+        return [], None
 
-    async def get_distinct_entities(self, user_id: Optional[str] = None) -> Set[str]:
-        query = """
-        SELECT DISTINCT VALUE e
-        FROM c
-        JOIN e IN c.entities
-        WHERE c.type = 'note'
+    def _distinct_query(
+        self,
+        array_path: str,
+        user_id: Optional[str]
+    ) -> Tuple[str, List[Dict[str, Any]]]:
         """
-        
-        entities = set()
-        async for result in self.container.query_items(query, enable_cross_partition_query=True):
-            entities.add(result)
-        return entities
+        DISTINCT query over one of the note's array fields, scoped to the
+        user when one is given so the scan doesn't fan out over every
+        user's documents.
+        """
+        query = (
+            "SELECT DISTINCT VALUE item "
+            f"FROM c JOIN item IN c.{array_path} "
+            "WHERE c.type = 'note'"
+        )
+        params: List[Dict[str, Any]] = []
+        if user_id:
+            query += " AND c.userId = @userId"
+            params.append({"name": "@userId", "value": user_id})
+        return query, params
+
+    async def get_distinct_categories(self, user_id: Optional[str] = None) -> Set[str]:
+        query, params = self._distinct_query("categories", user_id)
+        return {result async for result in self.container.query_items(
+            query, parameters=params, enable_cross_partition_query=True
+        )}
+
+    async def get_distinct_tags(self, user_id: Optional[str] = None) -> Set[str]:
+        query, params = self._distinct_query("tags", user_id)
+        return {result async for result in self.container.query_items(
+            query, parameters=params, enable_cross_partition_query=True
+        )}
+
+    async def get_distinct_entities(self, user_id: Optional[str] = None) -> Set[str]:
+        query, params = self._distinct_query("entities", user_id)
+        return {result async for result in self.container.query_items(
+            query, parameters=params, enable_cross_partition_query=True
+        )}
 
     async def create_container(self, partition_key_path: str = "/id") -> bool:
         """
@@ -383,9 +938,9 @@ class CosmosDBNotesService(NotesDbService):
                     {
                         "path": "/*"
                     },
-                    # Optimize for text search
+                    # Text search runs against the pre-lowered shadow fields
                     {
-                        "path": "/content/?",
+                        "path": "/contentLower/?",
                         "indexes": [
                             {
                                 "kind": "Range",
@@ -395,7 +950,7 @@ class CosmosDBNotesService(NotesDbService):
                         ]
                     },
                     {
-                        "path": "/title/?",
+                        "path": "/titleLower/?",
                         "indexes": [
                             {
                                 "kind": "Range",
@@ -405,7 +960,7 @@ class CosmosDBNotesService(NotesDbService):
                         ]
                     },
                     {
-                        "path": "/summary/?",
+                        "path": "/summaryLower/?",
                         "indexes": [
                             {
                                 "kind": "Range",
@@ -435,23 +990,24 @@ class CosmosDBNotesService(NotesDbService):
                             }
                         ]
                     },
-                    # Timestamp indexes for sorting and filtering
+                    # Timestamp indexes for sorting and filtering (numeric
+                    # epoch-millis twins of createdAt/updatedAt)
                     {
-                        "path": "/createdAt/?",
+                        "path": "/createdAtTs/?",
                         "indexes": [
                             {
                                 "kind": "Range",
-                                "dataType": "String",
+                                "dataType": "Number",
                                 "precision": -1
                             }
                         ]
                     },
                     {
-                        "path": "/updatedAt/?",
+                        "path": "/updatedAtTs/?",
                         "indexes": [
                             {
                                 "kind": "Range",
-                                "dataType": "String",
+                                "dataType": "Number",
                                 "precision": -1
                             }
                         ]
@@ -466,12 +1022,64 @@ class CosmosDBNotesService(NotesDbService):
                                 "precision": -1
                             }
                         ]
+                    },
+                    # Entity filtering / distinct-entity scans
+                    {
+                        "path": "/entities/*",
+                        "indexes": [
+                            {
+                                "kind": "Range",
+                                "dataType": "String",
+                                "precision": -1
+                            }
+                        ]
+                    },
+                    # Lowercased array twins used by case-insensitive search
+                    {
+                        "path": "/tagsLower/*",
+                        "indexes": [
+                            {
+                                "kind": "Range",
+                                "dataType": "String",
+                                "precision": -1
+                            }
+                        ]
+                    },
+                    {
+                        "path": "/categoriesLower/*",
+                        "indexes": [
+                            {
+                                "kind": "Range",
+                                "dataType": "String",
+                                "precision": -1
+                            }
+                        ]
+                    },
+                    {
+                        "path": "/entitiesLower/*",
+                        "indexes": [
+                            {
+                                "kind": "Range",
+                                "dataType": "String",
+                                "precision": -1
+                            }
+                        ]
                     }
                 ],
+                # Covering index for user-scoped recency queries. Array
+                # fields (tags/categories/entities) cannot take part in
+                # composite indexes, so they stay on their range indexes
+                # above.
+                "compositeIndexes": [
+                    [
+                        {"path": "/userId", "order": "ascending"},
+                        {"path": "/updatedAtTs", "order": "descending"}
+                    ]
+                ],
                 "excludedPaths": [
                     # Exclude paths that don't need indexing
                     {
-                        "path": "/content_map/?"
+                        "path": "/contentMap/*"
                     },
                     {
                         "path": "/metadata/?"
@@ -480,36 +1088,34 @@ class CosmosDBNotesService(NotesDbService):
                         "path": "/\"_etag\"/?"
                     }
                 ],
-                "vectorSearch": {
-                    "algorithms": [
-                        {
-                            "name": "hnsw",
-                            "configuration": {
-                                "m": 4,
-                                "efConstruction": 400,
-                                "efSearch": 500,
-                                "metric": "cosine"
-                            }
-                        }
-                    ],
-                    "indexes": [
-                        {
-                            "path": "/embedding/*",
-                            "kind": "vector-hnsw",
-                            "algorithm": "hnsw",
-                            "dimensions": 1536,  # Adjust based on your embedding size
-                            "metric": "cosine"
-                        }
-                    ]
-                }
+                "vectorIndexes": [
+                    {
+                        "path": "/embedding",
+                        "type": "diskANN"
+                    }
+                ]
+            }
+
+            # int8 embeddings: 4x smaller than float32 on disk and on the
+            # wire, and the server scores candidates with int8 SIMD kernels
+            vector_embedding_policy = {
+                "vectorEmbeddings": [
+                    {
+                        "path": "/embedding",
+                        "dataType": "int8",
+                        "dimensions": 1536,  # Adjust based on your embedding size
+                        "distanceFunction": "cosine"
+                    }
+                ]
             }
 
             await self.database.create_container(
                 id=self.container.id,
                 partition_key=PartitionKey(path=partition_key_path),
-                indexing_policy=indexing_policy
+                indexing_policy=indexing_policy,
+                vector_embedding_policy=vector_embedding_policy
             )
             return True
-        except Exception as e:
-            print(f"Error creating container: {str(e)}")
+        except Exception:
+            logger.exception("create_container failed")
             return False
\ No newline at end of file
@@ -1,31 +1,376 @@
 from typing import List, Optional, Dict, Any
-import json
+import base64
 import asyncio
+import os
+import re
+import time
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 
+import numpy as np
+import orjson
 from gremlin_python.driver import client, serializer
 from gremlin_python.driver.protocol import GremlinServerError
 from gremlin_python.process.graph_traversal import __
 from gremlin_python.process.traversal import T
 from gremlin_python.driver.aiohttp.transport import AiohttpTransport
+from gremlin_python.structure.io import graphsonV2d0
 
 from ...models.note import Note, NoteReference
 from ...models.content import ContentType, ContentUnion, TextContent, ImageContent, VideoContent, FileContent, LinkContent
-from ...utils.vector import calculate_vector_similarity
 from .base import NotesDbService
 
 
+# Cosmos DB's Gremlin API only speaks GraphSON V2, so the serializer
+# version is fixed — but the version's JSON encode/decode is the hot part
+# of response handling on property-heavy reads, and that can be swapped
+# for orjson's SIMD parser without changing the wire format.
+class _OrjsonGraphSONReader(graphsonV2d0.GraphSONReader):
+    def readObject(self, jsonData):
+        return self.toObject(orjson.loads(jsonData))
+
+
+class _OrjsonGraphSONWriter(graphsonV2d0.GraphSONWriter):
+    def writeObject(self, objectData):
+        return orjson.dumps(self.toDict(objectData)).decode()
+
+
+def _message_serializer():
+    return serializer.GraphSONSerializersV2d0(
+        reader=_OrjsonGraphSONReader(),
+        writer=_OrjsonGraphSONWriter()
+    )
+
+
+# Property-level (de)serialization helpers: identical JSON on the wire,
+# several times faster than stdlib json for the dict/list-heavy
+# tags/entities/metadata properties
+def _j(value: Any) -> str:
+    return orjson.dumps(value).decode()
+
+
+_l = orjson.loads
+
+
+# One traversal returning a note vertex together with its content
+# vertices and outgoing relationship edges, so materializing K notes
+# costs one round trip instead of 3K
+_Q_NOTES_PROJECTION = (
+    "g.V(ids).hasLabel('note')"
+    ".project('note', 'contents', 'links')"
+    ".by(__.elementMap())"
+    ".by(__.out('has_content').elementMap().fold())"
+    ".by(__.outE().not(__.hasLabel('has_content'))"
+    ".project('edge', 'vertex').by(__.elementMap()).by(__.inV().elementMap()).fold())"
+)
+
+# Fixed query texts, assembled once at import. Values always travel as
+# bindings, so identical scripts hit the server's compiled-plan cache.
+_Q_DROP_NOTE = "g.V(nid).drop()"
+_Q_DROP_CONTENTS = "g.V(nid).out('has_content').drop()"
+_Q_DROP_LINKS = "g.V(nid).outE().not(hasLabel('has_content')).drop()"
+
+_Q_VECTOR_SEARCH = (
+    "g.V().hasLabel('note')"
+    ".has('embedding')"  # Only search notes with embeddings
+    # Score filter runs server-side; rejected vertices never ship
+    ".where(vectorSimilarity(q, 'embedding').is(gte(minSim)))"
+    ".order().by(vectorSimilarity(q, 'embedding'))"
+    ".limit(lim)"
+    # Project both the vertex and the similarity score
+    ".project('vertex', 'score')"
+    ".by(elementMap())"
+    ".by(vectorSimilarity(q, 'embedding'))"
+)
+
+_Q_ADD_REFERENCE = (
+    "g.V(nid).addE(rel).to(g.V(rid))"
+    ".property('created_at', rat)"
+    ".property('metadata', rmeta)"
+)
+
+# Query texts below only depend on which filters are present, not on
+# their values (those ride as bindings), so each distinct filter shape
+# is assembled exactly once
+@lru_cache(maxsize=32)
+def _hybrid_search_query(has_user: bool, has_categories: bool, has_tags: bool,
+                         has_entities: bool, has_text: bool) -> str:
+    parts = ["g.V().hasLabel('note').has('embedding')"]
+    if has_user:
+        parts.append(".has('user_id', userId)")
+    if has_categories:
+        parts.append(".has('categories', containing(cats))")
+    if has_tags:
+        parts.append(".has('tags', containing(tagsJson))")
+    if has_entities:
+        parts.append(".has('entities', containing(entsJson))")
+    if has_text:
+        parts.append(
+            ".or_(__.has('title', containing(qText)), "
+            "__.has('summary', containing(qText)))"
+        )
+    # Filter on the similarity server-side so sub-threshold vertices
+    # never ship their properties back just to be discarded
+    parts.append(
+        ".where(vectorSimilarity(q, 'embedding').is(gte(minSim)))"
+        ".order().by(vectorSimilarity(q, 'embedding'))"
+        ".limit(lim)"
+        ".project('vertex', 'vscore')"
+        ".by(elementMap())"
+        ".by(vectorSimilarity(q, 'embedding'))"
+    )
+    return "".join(parts)
+
+
+@lru_cache(maxsize=16)
+def _search_notes_query(has_user: bool, has_categories: bool, has_tags: bool,
+                        has_text: bool) -> str:
+    parts = ["g.V().hasLabel('note')"]
+    if has_user:
+        parts.append(".has('user_id', userId)")
+    if has_categories:
+        parts.append(".has('categories', containing(cats))")
+    if has_tags:
+        parts.append(".has('tags', containing(tagsJson))")
+    if has_text:
+        parts.append(
+            ".or_(__.has('title', containing(sText)), "
+            "__.has('summary', containing(sText)))"
+        )
+    parts.append(".limit(lim)")
+    return "".join(parts)
+
+
+# Expand seed vertices through relationship edges and score every reached
+# note against the query embedding in the same traversal, returning only
+# (id, seed id, score) triples instead of full vertices
+_Q_LINKED_SCORED = (
+    "g.V(ids).as('seed')"
+    ".repeat(outE().not(hasLabel('has_content')).inV()).times(depth).emit()"
+    ".hasLabel('note').has('embedding')"
+    ".project('id', 'seed', 'score')"
+    ".by(id())"
+    ".by(select('seed').id())"
+    ".by(vectorSimilarity(q, 'embedding'))"
+)
+
+
+# Type-specific vertex properties per content class; direct type lookup
+# instead of an isinstance ladder on the write hot path
+_CONTENT_PROP_EXTRACTORS = {
+    TextContent: lambda c: {'text': c.text},
+    ImageContent: lambda c: {
+        'storage_url': c.storage_url,
+        'alt_text': c.alt_text,
+        'ocr_text': c.ocr_text,
+        'description': c.description
+    },
+    VideoContent: lambda c: {
+        'storage_url': c.storage_url,
+        'duration_seconds': c.duration_seconds
+    },
+    FileContent: lambda c: {
+        'storage_url': c.storage_url,
+        'original_filename': c.original_filename
+    },
+    LinkContent: lambda c: {
+        'url': c.url,
+        'storage_url': c.storage_url
+    },
+}
+
+
+def _content_to_props(content: ContentUnion) -> Dict[str, Any]:
+    """Flatten a content object into its vertex properties."""
+    props = {
+        'type': content.type.value,
+        'preview': content.preview,
+        'content': content.content
+    }
+    extractor = _CONTENT_PROP_EXTRACTORS.get(type(content))
+    if extractor is not None:
+        props.update(extractor(content))
+    return props
+
+
+class _LRUKCache:
+    """LRU-K cache (default K=2).
+
+    Eviction ranks entries by their K-th most recent access, so a burst of
+    one-off lookups cannot flush the repeatedly visited hub notes that
+    multi-depth traversals keep coming back to. Entries touched fewer than
+    K times are always evicted before any entry with a full history.
+    """
+
+    def __init__(self, capacity: int = 1024, k: int = 2):
+        self.capacity = capacity
+        self.k = k
+        # key -> (access timestamps, value); the deque keeps the K newest
+        self._entries: Dict[str, Any] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry[0].append(time.monotonic())
+        return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[0].append(time.monotonic())
+            self._entries[key] = (entry[0], value)
+            return
+        if len(self._entries) >= self.capacity:
+            self._evict()
+        history = deque(maxlen=self.k)
+        history.append(time.monotonic())
+        self._entries[key] = (history, value)
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def _evict(self) -> None:
+        victim = min(
+            self._entries.items(),
+            key=lambda item: (len(item[1][0]) >= self.k, item[1][0][0])
+        )
+        del self._entries[victim[0]]
+
+
+class GremlinBulkWriter:
+    """Coalesces individual Gremlin write fragments into batched scripts.
+
+    Callers enqueue a write fragment with its bindings and await the
+    result; a background flusher drains whatever arrived within a short
+    window (or up to max_batch entries) and submits it as one
+    semicolon-joined script, amortizing the WebSocket round trip and
+    GraphSON framing across every write in the batch. Bindings are
+    renamed per entry so fragments cannot collide.
+    """
+
+    def __init__(self, client, max_batch: int = 64, max_wait: float = 0.005):
+        self.client = client
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._flusher: Optional[asyncio.Task] = None
+        # Set whenever no entry is queued or mid-batch; close() waits on it
+        # so cancellation never lands inside a batch
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @staticmethod
+    def _namespace(index: int, fragment: str, bindings: Dict[str, Any]):
+        """Prefix binding names with the batch index to keep them unique."""
+        renamed = {}
+        for name, value in bindings.items():
+            new_name = f"b{index}_{name}"
+            fragment = re.sub(rf"\b{re.escape(name)}\b", new_name, fragment)
+            renamed[new_name] = value
+        return fragment, renamed
+
+    async def enqueue(self, fragment: str, bindings: Optional[Dict[str, Any]] = None) -> None:
+        """Queue a write fragment and wait for its batch to be submitted."""
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+        future = asyncio.get_running_loop().create_future()
+        self._idle.clear()
+        await self._queue.put((fragment, bindings or {}, future))
+        await future
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                fragments = []
+                merged: Dict[str, Any] = {}
+                for index, (fragment, bindings, _) in enumerate(batch):
+                    fragment, bindings = self._namespace(index, fragment, bindings)
+                    fragments.append(fragment)
+                    merged.update(bindings)
+                try:
+                    await self.client.submitAsync(";".join(fragments), merged)
+                except Exception as exc:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(exc)
+                else:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_result(None)
+            except asyncio.CancelledError:
+                # Cancellation mid-batch must not leave callers awaiting
+                # futures that will never resolve
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(
+                            ConnectionError("bulk writer closed before the batch was submitted")
+                        )
+                raise
+            finally:
+                if self._queue.empty():
+                    self._idle.set()
+
+    async def close(self) -> None:
+        """Stop the flusher after in-flight batches have been submitted."""
+        if self._flusher is not None:
+            # Queue empty alone only means the batch was dequeued; wait for
+            # the flusher to finish submitting it before cancelling
+            await self._idle.wait()
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+
 class CosmosNotesGraphService(NotesDbService):
+    # Upper bound on chained steps per Gremlin request; keeps each script
+    # under Cosmos request-size limits while still collapsing the
+    # one-round-trip-per-vertex pattern into a handful of requests
+    MAX_BATCH_STEPS = 50
+    # Ids per projection query and how many such queries run at once when
+    # a bulk fetch outgrows a single request
+    BULK_FETCH_CHUNK = 32
+    BULK_FETCH_CONCURRENCY = 8
+
     def __init__(self, endpoint: str, key: str, database: str, container: str):
         """Initialize the Cosmos DB Graph (Gremlin) client."""
+        # With the default single connection, concurrent traversals
+        # serialize on one WebSocket; a pool keeps them in flight together
+        pool_size = int(os.getenv("COSMOS_GREMLIN_POOL_SIZE", "16"))
         self.client = client.Client(
             f'{endpoint}',
             'g',
             username=f"/dbs/{database}/colls/{container}",
             password=key,
-            message_serializer=serializer.GraphSONSerializersV2d0(),
-            transport_factory=AiohttpTransport(call_from_event_loop=True)
+            message_serializer=_message_serializer(),
+            pool_size=pool_size,
+            max_workers=pool_size,
+            # Must be a factory: each pooled connection needs its own
+            # transport instance
+            transport_factory=lambda: AiohttpTransport(call_from_event_loop=True)
         )
+        # Individual writes funnel through one coalescing writer so
+        # concurrent callers share round trips
+        self.writer = GremlinBulkWriter(self.client)
+        # Traversal-aware note cache: related-note walks and consecutive
+        # searches revisit the same hub vertices constantly
+        self._note_cache = _LRUKCache(capacity=1024, k=2)
+        self._fetch_semaphore = asyncio.Semaphore(self.BULK_FETCH_CONCURRENCY)
 
     async def __aenter__(self):
         return self
@@ -35,9 +380,22 @@ class CosmosNotesGraphService(NotesDbService):
 
     async def close(self):
         """Close the Gremlin client connection."""
-        pass
+        await self.writer.close()
         #await self.client.close()
 
+    @staticmethod
+    def _embedding_binding(embedding) -> List[float]:
+        """Embedding as a plain list, ready to travel as a Gremlin binding."""
+        return embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+
+    @staticmethod
+    def _decode_embedding(value: str) -> List[float]:
+        """Decode a stored embedding; handles legacy JSON-list values."""
+        if value.startswith('['):
+            # Written before embeddings moved to base64 float32
+            return _l(value)
+        return np.frombuffer(base64.b64decode(value), dtype=np.float32).tolist()
+
     def _serialize_datetime(self, dt: datetime) -> int:
         """Convert datetime to timestamp for Cosmos DB storage."""
         return int(dt.timestamp() * 1000)
@@ -50,213 +408,239 @@ class CosmosNotesGraphService(NotesDbService):
         """Prepare note properties for vertex creation."""
         properties = {
             'user_id': note.user_id,
-            'categories': note.categories,
+            'categories': _j(note.categories),
             'title': note.title,
-            'tags': json.dumps(note.tags),
+            'tags': _j(note.tags),
             'summary': note.summary,
-            'entities': json.dumps(note.entities),
+            'entities': _j(note.entities),
             'created_at': self._serialize_datetime(note.created_at),
             'updated_at': self._serialize_datetime(note.updated_at),
-            'metadata': json.dumps(note.metadata)
+            'metadata': _j(note.metadata)
         }
-        if note.embedding:
-            properties['embedding'] = json.dumps(note.embedding)
+        if note.embedding is not None:
+            # float32 bytes in base64: ~8 KB per 1536-dim vector instead of
+            # ~30 KB of JSON text, and decoding is a buffer copy rather
+            # than parsing thousands of number literals
+            properties['embedding'] = base64.b64encode(
+                np.asarray(note.embedding, dtype=np.float32).tobytes()
+            ).decode()
         return properties
 
     async def create_note(self, note: Note, user_id: Optional[str] = None) -> Note:
-        """Create a new note vertex in the graph."""
+        """Create a note vertex plus its contents and links in batched traversals.
+
+        Instead of one submitAsync round trip per content vertex and per
+        linked-note edge, the whole subgraph is chained into a single
+        traversal (split only when it would exceed MAX_BATCH_STEPS), with
+        every value passed as a binding so the server can cache the plan.
+        """
         properties = self._prepare_note_properties(note)
-        
-        # Create the main note vertex
-        query = (
-            "g.addV('note')"
-            f".property(T.id, '{note.note_id}')"
-        )
-        
-        # Add all properties
+
+        parts = ["g.addV('note').property(T.id, nid)"]
+        bindings: Dict[str, Any] = {'nid': note.note_id}
         for key, value in properties.items():
             if value is not None:
-                query += f".property('{key}', '{value}')"
-
-        await self.client.submitAsync(query)
-
-        # Create content vertices and edges
-        for content in note.contents:
-            content_props = {
-                'type': content.type.value,
-                'preview': content.preview,
-                'content': content.content
-            }
-            
-            # Add type-specific properties
-            if isinstance(content, TextContent):
-                content_props['text'] = content.text
-            elif isinstance(content, ImageContent):
-                content_props.update({
-                    'storage_url': content.storage_url,
-                    'alt_text': content.alt_text,
-                    'ocr_text': content.ocr_text,
-                    'description': content.description
-                })
-            elif isinstance(content, VideoContent):
-                content_props.update({
-                    'storage_url': content.storage_url,
-                    'duration_seconds': content.duration_seconds
-                })
-            elif isinstance(content, FileContent):
-                content_props.update({
-                    'storage_url': content.storage_url,
-                    'original_filename': content.original_filename
-                })
-            elif isinstance(content, LinkContent):
-                content_props.update({
-                    'url': content.url,
-                    'storage_url': content.storage_url
-                })
-
-            # Create content vertex and edge
-            content_query = (
-                "g.addV('content')"
-                f".property(T.id, '{content.content_id}')"
-            )
+                bindings[f"p_{key}"] = value
+                parts.append(f".property('{key}', p_{key})")
+        parts.append(".as('n')")
+
+        async def flush():
+            nonlocal parts, bindings
+            await self.client.submitAsync("".join(parts), bindings)
+            parts = ["g.V(nid).as('n')"]
+            bindings = {'nid': note.note_id}
+
+        for idx, content in enumerate(note.contents):
+            content_props = _content_to_props(content)
+            bindings[f"c{idx}_id"] = content.content_id
+            parts.append(f".addV('content').property(T.id, c{idx}_id)")
             for key, value in content_props.items():
                 if value is not None:
-                    content_query += f".property('{key}', '{value}')"
-            
-            content_query += (
-                f".addE('has_content').from_(g.V('{note.note_id}'))"
+                    bindings[f"c{idx}_{key}"] = value
+                    parts.append(f".property('{key}', c{idx}_{key})")
+            # Step back onto the note vertex so the next content chains on
+            parts.append(".addE('has_content').from_('n').outV()")
+            if len(parts) >= self.MAX_BATCH_STEPS:
+                await flush()
+
+        for idx, ref in enumerate(note.linked_notes):
+            bindings[f"r{idx}_id"] = ref.note_id
+            bindings[f"r{idx}_rel"] = ref.relationship_type
+            bindings[f"r{idx}_at"] = self._serialize_datetime(ref.created_at)
+            bindings[f"r{idx}_meta"] = _j(ref.metadata)
+            parts.append(
+                f".addE(r{idx}_rel).to(g.V(r{idx}_id))"
+                f".property('created_at', r{idx}_at)"
+                f".property('metadata', r{idx}_meta)"
+                ".outV()"
             )
-            
-            await self.client.submitAsync(content_query)
+            if len(parts) >= self.MAX_BATCH_STEPS:
+                await flush()
 
-        # Create edges for linked notes
-        for ref in note.linked_notes:
-            link_query = (
-                f"g.V('{note.note_id}')"
-                f".addE('{ref.relationship_type}')"
-                f".to(g.V('{ref.note_id}'))"
-                f".property('created_at', '{self._serialize_datetime(ref.created_at)}')"
-                f".property('metadata', '{json.dumps(ref.metadata)}')"
-            )
-            await self.client.submitAsync(link_query)
+        if len(parts) > 1:
+            await self.client.submitAsync("".join(parts), bindings)
 
         return note
-    
-    async def get_note(self, note_id: str, user_id: Optional[str] = None) -> Optional[Note]:
-        """Retrieve a note and all its contents by ID."""
-        # Get the main note vertex
-        query = f"g.V('{note_id}')"
-        result = await self.client.submitAsync(query)
-        
-        note_vertex = await result.all().result()
-        if not note_vertex:
-            return None
-
-        # Extract note properties
-        props = note_vertex[0].properties
-        
-        # Get all content vertices
-        content_query = (
-            f"g.V('{note_id}').out('has_content')"
-        )
-        content_result = await self.client.submitAsync(content_query)
-        content_vertices = await content_result.all().result()
-
-        # Convert content vertices to ContentUnion objects
-        contents = []
-        for vertex in content_vertices:
-            content_props = vertex.properties
-            content_type = ContentType(content_props['type'][0])
-            
-            if content_type == ContentType.TEXT:
-                contents.append(TextContent(
-                    content_id=vertex.id,
-                    preview=content_props.get('preview', [None])[0],
-                    content=content_props.get('content', [None])[0],
-                    text=content_props['text'][0]
-                ))
-            elif content_type == ContentType.IMAGE:
-                contents.append(ImageContent(
-                    content_id=vertex.id,
-                    preview=content_props.get('preview', [None])[0],
-                    content=content_props.get('content', [None])[0],
-                    storage_url=content_props['storage_url'][0],
-                    alt_text=content_props.get('alt_text', [None])[0],
-                    ocr_text=content_props.get('ocr_text', [None])[0],
-                    description=content_props.get('description', [None])[0]
-                ))
-            # Add similar handling for other content types...
 
-        # Get linked notes
-        links_query = (
-            f"g.V('{note_id}').outE().project('edge', 'vertex')"
-            ".by(__.elementMap())"
-            ".by(__.inV().elementMap())"
-        )
-        links_result = await self.client.submitAsync(links_query)
-        links_data = await links_result.all().result()
+    def _content_from_map(self, content_map: Dict[Any, Any]) -> Optional[ContentUnion]:
+        """Build a content object from an elementMap row; None if untyped."""
+        content_type = ContentType(content_map['type'])
+        common = {
+            'content_id': content_map[T.id],
+            'preview': content_map.get('preview'),
+            'content': content_map.get('content')
+        }
+        if content_type == ContentType.TEXT:
+            return TextContent(**common, text=content_map.get('text'))
+        if content_type == ContentType.IMAGE:
+            return ImageContent(
+                **common,
+                storage_url=content_map.get('storage_url'),
+                alt_text=content_map.get('alt_text'),
+                ocr_text=content_map.get('ocr_text'),
+                description=content_map.get('description')
+            )
+        if content_type == ContentType.VIDEO:
+            return VideoContent(
+                **common,
+                storage_url=content_map.get('storage_url'),
+                duration_seconds=content_map.get('duration_seconds')
+            )
+        if content_type in (ContentType.FILE, ContentType.DOCUMENT):
+            return FileContent(
+                **common,
+                storage_url=content_map.get('storage_url'),
+                original_filename=content_map.get('original_filename')
+            )
+        if content_type == ContentType.LINK:
+            return LinkContent(
+                **common,
+                url=content_map.get('url'),
+                storage_url=content_map.get('storage_url')
+            )
+        return None
 
-        linked_notes = []
-        for link in links_data:
-            if link['edge'].label != 'has_content':  # Skip content edges
+    def _rows_to_notes(self, rows: List[Dict[str, Any]]) -> List[Note]:
+        """Convert projection-query rows into Note objects."""
+        notes = []
+        for row in rows:
+            note_map = row['note']
+            contents = []
+            for content_map in row['contents']:
+                content = self._content_from_map(content_map)
+                if content:
+                    contents.append(content)
+            linked_notes = []
+            for link in row['links']:
+                edge = link['edge']
                 linked_notes.append(NoteReference(
-                    note_id=link['vertex'].id,
-                    relationship_type=link['edge'].label,
-                    created_at=self._deserialize_datetime(link['edge'].properties['created_at']),
-                    metadata=json.loads(link['edge'].properties.get('metadata', '{}'))
+                    note_id=link['vertex'][T.id],
+                    relationship_type=edge[T.label],
+                    created_at=self._deserialize_datetime(int(edge['created_at'])),
+                    metadata=_l(edge.get('metadata', '{}'))
                 ))
+            notes.append(Note(
+                note_id=note_map[T.id],
+                user_id=note_map.get('user_id'),
+                contents=contents,
+                categories=_l(note_map.get('categories', '[]')),
+                title=note_map.get('title'),
+                tags=_l(note_map.get('tags', '[]')),
+                summary=note_map.get('summary'),
+                entities=_l(note_map.get('entities', '{}')),
+                embedding=self._decode_embedding(note_map['embedding']) if 'embedding' in note_map else None,
+                linked_notes=linked_notes,
+                created_at=self._deserialize_datetime(note_map['created_at']),
+                updated_at=self._deserialize_datetime(note_map['updated_at']),
+                metadata=_l(note_map.get('metadata', '{}'))
+            ))
+        return notes
 
-        # Construct and return the complete Note object
-        return Note(
-            note_id=note_id,
-            user_id=props.get('user_id', [None])[0],
-            contents=contents,
-            categories=json.loads(props.get('categories', ['[]'])[0]),
-            title=props.get('title', [None])[0],
-            tags=json.loads(props.get('tags', ['[]'])[0]),
-            summary=props.get('summary', [None])[0],
-            entities=json.loads(props.get('entities', ['{}'])[0]),
-            embedding=json.loads(props.get('embedding', ['null'])[0]) if 'embedding' in props else None,
-            linked_notes=linked_notes,
-            created_at=self._deserialize_datetime(props['created_at'][0]),
-            updated_at=self._deserialize_datetime(props['updated_at'][0]),
-            metadata=json.loads(props.get('metadata', ['{}'])[0])
-        )
+    async def _get_notes_bulk(self, note_ids: List[str]) -> Dict[str, Note]:
+        """Fetch fully materialized notes for the given ids in one query."""
+        if not note_ids:
+            return {}
+        notes: Dict[str, Note] = {}
+        missing = []
+        for note_id in dict.fromkeys(note_ids):
+            cached = self._note_cache.get(note_id)
+            if cached is not None:
+                notes[note_id] = cached
+            else:
+                missing.append(note_id)
+        if missing:
+            # Large id lists split into chunked projection queries that run
+            # concurrently, gated by a semaphore so a single wide fan-out
+            # can't monopolize the connection pool
+            chunks = [
+                missing[i:i + self.BULK_FETCH_CHUNK]
+                for i in range(0, len(missing), self.BULK_FETCH_CHUNK)
+            ]
+            row_groups = await asyncio.gather(
+                *(self._fetch_note_rows(chunk) for chunk in chunks)
+            )
+            for rows in row_groups:
+                for note in self._rows_to_notes(rows):
+                    notes[note.note_id] = note
+                    self._note_cache.put(note.note_id, note)
+        return notes
+
+    async def _fetch_note_rows(self, note_ids: List[str]) -> List[Dict[str, Any]]:
+        async with self._fetch_semaphore:
+            result = await self.client.submitAsync(
+                _Q_NOTES_PROJECTION, {'ids': note_ids}
+            )
+            return await result.all().result()
+
+    async def get_note(self, note_id: str, user_id: Optional[str] = None) -> Optional[Note]:
+        """Retrieve a note and all its contents by ID."""
+        notes = await self._get_notes_bulk([note_id])
+        return notes.get(note_id)
 
     async def update_note(self, note: Note, user_id: Optional[str] = None) -> None:
         """Update an existing note."""
+        self._note_cache.invalidate(note.note_id)
+        for ref in note.linked_notes:
+            self._note_cache.invalidate(ref.note_id)
         # First, remove all existing content vertices and edges
-        await self.client.submitAsync(
-            f"g.V('{note.note_id}').out('has_content').drop()"
-        )
+        await self.client.submitAsync(_Q_DROP_CONTENTS, {'nid': note.note_id})
         
         # Update main note vertex properties
         properties = self._prepare_note_properties(note)
-        update_query = f"g.V('{note.note_id}')"
+        parts = ["g.V(nid)"]
+        bindings: Dict[str, Any] = {'nid': note.note_id}
         for key, value in properties.items():
             if value is not None:
-                update_query += f".property('{key}', '{value}')"
+                bindings[f"p_{key}"] = value
+                parts.append(f".property('{key}', p_{key})")
         
-        await self.client.submitAsync(update_query)
+        await self.client.submitAsync("".join(parts), bindings)
         
-        # Re-create content vertices and edges
-        for content in note.contents:
-            await self.create_note_content(note.note_id, content)
+        # Re-create content vertices and edges concurrently; the writes are
+        # independent, so their round trips overlap (and the bulk writer
+        # coalesces them into shared scripts)
+        if note.contents:
+            await asyncio.gather(*(
+                self.create_note_content(note.note_id, content)
+                for content in note.contents
+            ))
 
         # Update linked notes
         # First remove existing relationship edges
-        await self.client.submitAsync(
-            f"g.V('{note.note_id}').outE().not(hasLabel('has_content')).drop()"
-        )
+        await self.client.submitAsync(_Q_DROP_LINKS, {'nid': note.note_id})
         
         # Create new relationship edges
-        for ref in note.linked_notes:
-            await self.create_note_reference(note.note_id, ref)
+        if note.linked_notes:
+            await asyncio.gather(*(
+                self.create_note_reference(note.note_id, ref)
+                for ref in note.linked_notes
+            ))
 
     async def delete_note(self, note_id: str, user_id: Optional[str] = None) -> None:
         """Delete a note and all its contents."""
+        self._note_cache.invalidate(note_id)
         # This will delete the note vertex and all connected edges
-        await self.client.submitAsync(f"g.V('{note_id}').drop()")
+        await self.client.submitAsync(_Q_DROP_NOTE, {'nid': note_id})
 
     async def hybrid_search(self,
                            query_embedding: List[float],
@@ -273,70 +657,75 @@ class CosmosNotesGraphService(NotesDbService):
         Perform hybrid search combining vector similarity with graph traversal.
         Returns list of (note, combined_score) tuples.
         """
-        # Start with vector similarity search
-        base_query = (
-            "g.V().hasLabel('note')"
-            f".has('embedding')"
-        )
-        
-        # Add filters
+        # Start with vector similarity search. Filter values travel as
+        # bindings, so the memoized builder only sees the filter shape and
+        # the server can reuse cached plans.
+        bindings: Dict[str, Any] = {
+            'q': self._embedding_binding(query_embedding),
+            'minSim': min_similarity,
+            'lim': limit
+        }
         if user_id:
-            base_query += f".has('user_id', '{user_id}')"
+            bindings['userId'] = user_id
         if categories:
-            base_query += f".has('categories', containing('{json.dumps(categories)}')"
+            bindings['cats'] = _j(categories)
         if tags:
-            base_query += f".has('tags', containing('{json.dumps(tags)}')"
+            bindings['tagsJson'] = _j(tags)
         if entities:
-            base_query += f".has('entities', containing('{json.dumps(entities)}')"
+            bindings['entsJson'] = _j(entities)
         if query_text:
-            base_query += (
-                f".or_(__.has('title', containing('{query_text}')), "
-                f"__.has('summary', containing('{query_text}')))"
-            )
-        
-        # Add vector similarity ordering and scoring
-        query = (
-            f"{base_query}"
-            f".order().by(vectorSimilarity('{json.dumps(query_embedding)}', 'embedding'))"
-            f".limit({limit})"
-            ".project('vertex', 'vscore')"
-            ".by(elementMap())"
-            f".by(vectorSimilarity('{json.dumps(query_embedding)}', 'embedding'))"
+            bindings['qText'] = query_text
+
+        query = _hybrid_search_query(
+            bool(user_id), bool(categories), bool(tags),
+            bool(entities), bool(query_text)
         )
-        
-        result = await self.client.submitAsync(query)
+        result = await self.client.submitAsync(query, bindings)
         matches = await result.all().result()
         
-        # Process initial results
-        scored_notes = {}  # Dict[note_id, (Note, score)]
-        for match in matches:
-            score = match['vscore']
-            if score >= min_similarity:
-                note = await self.get_note(match['vertex'].id)
-                if note:
-                    scored_notes[note.note_id] = (note, score)
+        # Matches are already score-filtered server-side; collect ids and
+        # materialize them in a single projection query
+        scores = {match['vertex'][T.id]: match['vscore'] for match in matches}
+        notes_by_id = await self._get_notes_bulk(list(scores))
+        scored_notes = {
+            note_id: (note, scores[note_id])
+            for note_id, note in notes_by_id.items()
+        }
         
         # If requested, include linked notes
-        if include_linked:
-            for note_id, (note, score) in list(scored_notes.items()):
-                linked_notes = await self.get_related_notes(
-                    note_id, max_depth=max_linked_depth
-                )
-                for linked_note in linked_notes:
-                    if linked_note.note_id not in scored_notes:
-                        # Reduce score based on graph distance
-                        distance_penalty = 0.8 ** max_linked_depth
-                        if linked_note.embedding:
-                            # Calculate vector similarity for linked note
-                            linked_score = calculate_vector_similarity(
-                                query_embedding, linked_note.embedding
-                            )
-                            # Combine scores with distance penalty
-                            combined_score = (score + linked_score) / 2 * distance_penalty
-                            if combined_score >= min_similarity:
-                                scored_notes[linked_note.note_id] = (
-                                    linked_note, combined_score
-                                )
+        if include_linked and scored_notes:
+            # Reduce score based on graph distance
+            distance_penalty = 0.8 ** max_linked_depth
+            # One traversal expands every seed and scores the reached notes
+            # server-side; only ids and scores come back, and embeddings
+            # never leave the server
+            result = await self.client.submitAsync(
+                _Q_LINKED_SCORED,
+                {
+                    'ids': list(scored_notes),
+                    'depth': max_linked_depth,
+                    'q': bindings['q']
+                }
+            )
+            rows = await result.all().result()
+            # linked id -> (seed score, linked score); first seed wins when
+            # several seeds reach the same note
+            candidates: Dict[str, tuple[float, float]] = {}
+            for row in rows:
+                if row['id'] not in scored_notes:
+                    candidates.setdefault(
+                        row['id'], (scored_notes[row['seed']][1], row['score'])
+                    )
+            accepted = {}
+            for linked_id, (seed_score, linked_score) in candidates.items():
+                # Combine scores with distance penalty
+                combined_score = (seed_score + linked_score) / 2 * distance_penalty
+                if combined_score >= min_similarity:
+                    accepted[linked_id] = combined_score
+            if accepted:
+                linked_by_id = await self._get_notes_bulk(list(accepted))
+                for linked_id, linked_note in linked_by_id.items():
+                    scored_notes[linked_id] = (linked_note, accepted[linked_id])
         
         # Sort by final scores and return
         return sorted(
@@ -356,32 +745,27 @@ class CosmosNotesGraphService(NotesDbService):
         """
         Search notes based on various criteria.
         """
-        query = "g.V().hasLabel('note')"
-        
+        bindings: Dict[str, Any] = {'lim': limit}
         if user_id:
-            query += f".has('user_id', '{user_id}')"
+            bindings['userId'] = user_id
         if categories:
-            query += f".has('categories', containing('{json.dumps(categories)}')"
+            bindings['cats'] = _j(categories)
         if tags:
-            query += f".has('tags', containing('{json.dumps(tags)}')"
+            bindings['tagsJson'] = _j(tags)
         if search_text:
-            query += (
-                f".or_(__.has('title', containing('{search_text}')), "
-                f"__.has('summary', containing('{search_text}')))"
-            )
-        
-        query += f".limit({limit})"
-        
-        result = await self.client.submitAsync(query)
+            bindings['sText'] = search_text
+
+        query = _search_notes_query(
+            bool(user_id), bool(categories), bool(tags), bool(search_text)
+        )
+        result = await self.client.submitAsync(query, bindings)
         vertices = await result.all().result()
         
-        notes = []
-        for vertex in vertices:
-            note = await self.get_note(vertex.id)
-            if note:
-                notes.append(note)
-        
-        return notes
+        # Preserve the server's result order; the bulk-fetch dict interleaves
+        # cache hits and fetched rows arbitrarily
+        ordered_ids = [vertex.id for vertex in vertices]
+        notes_by_id = await self._get_notes_bulk(ordered_ids)
+        return [notes_by_id[i] for i in dict.fromkeys(ordered_ids) if i in notes_by_id]
 
     async def vector_search(self, 
                             query_embedding: List[float],
@@ -391,140 +775,90 @@ class CosmosNotesGraphService(NotesDbService):
         Search notes using vector similarity.
         Returns list of (note, similarity_score) tuples.
         """
-        # Cosmos DB supports vector search through custom functions
-        query = (
-            "g.V().hasLabel('note')"
-            f".has('embedding')"  # Only search notes with embeddings
-            f".order().by(vectorSimilarity('{json.dumps(query_embedding)}', 'embedding'))"
-            f".limit({limit})"
-            # Project both the vertex and the similarity score
-            ".project('vertex', 'score')"
-            ".by(elementMap())"
-            f".by(vectorSimilarity('{json.dumps(query_embedding)}', 'embedding'))"
+        # Cosmos DB supports vector search through custom functions; the
+        # embedding travels as one binding rather than being re-encoded
+        # into the query text per use
+        result = await self.client.submitAsync(
+            _Q_VECTOR_SEARCH,
+            {
+                'q': self._embedding_binding(query_embedding),
+                'minSim': min_similarity,
+                'lim': limit
+            }
         )
-        
-        result = await self.client.submitAsync(query)
         matches = await result.all().result()
         
-        notes_with_scores = []
-        for match in matches:
-            score = match['score']
-            if score >= min_similarity:
-                note = await self.get_note(match['vertex'].id)
-                if note:
-                    notes_with_scores.append((note, score))
-        
-        return notes_with_scores
+        scores = {match['vertex'][T.id]: match['score'] for match in matches}
+        notes_by_id = await self._get_notes_bulk(list(scores))
+        # Iterate the scores dict, not the fetch result, so the server's
+        # similarity ranking survives the cache/fetch interleaving
+        return [(notes_by_id[i], scores[i]) for i in scores if i in notes_by_id]
 
     async def get_related_notes(self, note_id: str, 
                             relationship_type: Optional[str] = None,
                             max_depth: int = 2) -> List[Note]:
         """Get related notes up to a certain depth."""
-        query = f"g.V('{note_id}')"
+        query = "g.V(nid)"
+        bindings: Dict[str, Any] = {'nid': note_id, 'depth': max_depth}
         
         if relationship_type:
-            query += f".repeat(outE('{relationship_type}').inV())"
+            query += ".repeat(outE(rel).inV())"
+            bindings['rel'] = relationship_type
         else:
             query += ".repeat(outE().inV())"
             
-        query += f".times({max_depth}).emit()"
+        query += ".times(depth).emit()"
         
-        result = await self.client.submitAsync(query)
+        result = await self.client.submitAsync(query, bindings)
         vertices = await result.all().result()
         
-        notes = []
-        seen_ids = set()
-        for vertex in vertices:
-            if vertex.id not in seen_ids:
-                note = await self.get_note(vertex.id)
-                if note:
-                    notes.append(note)
-                    seen_ids.add(vertex.id)
-        
-        return notes
+        # Dedup before dispatch; one projection query covers the lot
+        unique_ids = list({vertex.id for vertex in vertices})
+        notes_by_id = await self._get_notes_bulk(unique_ids)
+        return list(notes_by_id.values())
 
     async def create_note_content(self, note_id: str, content: ContentUnion) -> None:
         """Helper method to create content vertex and edge."""
-        content_props = {
-            'type': content.type.value,
-            'preview': content.preview,
-            'content': content.content
-        }
-        
-        # Add type-specific properties
-        if isinstance(content, TextContent):
-            content_props['text'] = content.text
-        elif isinstance(content, ImageContent):
-            content_props.update({
-                'storage_url': content.storage_url,
-                'alt_text': content.alt_text,
-                'ocr_text': content.ocr_text,
-                'description': content.description
-            })
-        # Add handling for other content types...
-        
-        content_query = (
-            "g.addV('content')"
-            f".property(T.id, '{content.content_id}')"
-        )
+        content_props = _content_to_props(content)
         
+        parts = ["g.addV('content').property(T.id, cid)"]
+        bindings: Dict[str, Any] = {'cid': content.content_id, 'nid': note_id}
         for key, value in content_props.items():
             if value is not None:
-                content_query += f".property('{key}', '{value}')"
-        
-        content_query += f".addE('has_content').from_(g.V('{note_id}'))"
+                bindings[f"c_{key}"] = value
+                parts.append(f".property('{key}', c_{key})")
+        parts.append(".addE('has_content').from_(g.V(nid))")
         
-        await self.client.submitAsync(content_query)
+        await self.writer.enqueue("".join(parts), bindings)
 
     async def create_note_reference(self, note_id: str, reference: NoteReference) -> None:
         """Helper method to create note reference edge."""
-        query = (
-            f"g.V('{note_id}')"
-            f".addE('{reference.relationship_type}')"
-            f".to(g.V('{reference.note_id}'))"
-            f".property('created_at', '{self._serialize_datetime(reference.created_at)}')"
-            f".property('metadata', '{json.dumps(reference.metadata)}')"
+        await self.writer.enqueue(
+            _Q_ADD_REFERENCE,
+            {
+                'nid': note_id,
+                'rel': reference.relationship_type,
+                'rid': reference.note_id,
+                'rat': self._serialize_datetime(reference.created_at),
+                'rmeta': _j(reference.metadata)
+            }
         )
-        await self.client.submitAsync(query)
 
     async def get_recent_notes(self, user_id: Optional[str] = None, offset: int = 0, limit: int = 10) -> List[Note]:
         query = "g.V().hasLabel('note')"
+        bindings: Dict[str, Any] = {'lo': offset, 'hi': offset + limit}
         if user_id:
-            query += f".has('user_id', '{user_id}')"
+            query += ".has('user_id', userId)"
+            bindings['userId'] = user_id
         query += ".order().by('updated_at', decr)"
-        query += f".range({offset}, {offset + limit})"
+        query += ".range(lo, hi)"
 
-        #result = await self._submit_query(query)
-        result = await self.client.submit_async(query)
+        result = await self.client.submitAsync(query, bindings)
         vertices = await result.all().result()
 
-        notes = []
-        for vertex in vertices:
-            note = await self.get_note(vertex.id, user_id=user_id)
-            if note:
-                notes.append(note)
-
-        return notes
-    
-    async def _submit_query(self, query):
-        future = await self.client.submit_async(query)
-        #result = await asyncio.wrap_future(future)
-        return result 
-    
-    
-    async def _run_query(self, query):
-        """
-        Submit a Gremlin query using submitAsync() and integrate it with asyncio.
-        """
-        # submitAsync() immediately returns a concurrent.futures.Future
-        # which we can wrap with asyncio to avoid blocking
-        loop = asyncio.get_running_loop()
-
-        future = self.client.submitAsync(query)
-
-        # Wrap the future in an asyncio-compatible call
-        # so that we can await it without blocking the event loop
-        result_set = await loop.run_in_executor(None, future.result)
-        return result_set
+        # Keep the updated_at-descending order the server produced
+        ordered_ids = [vertex.id for vertex in vertices]
+        notes_by_id = await self._get_notes_bulk(ordered_ids)
+        return [notes_by_id[i] for i in ordered_ids if i in notes_by_id]
 
 
@@ -1,6 +1,7 @@
+import asyncio
 import io
 import os
-from typing import Union, BinaryIO
+from typing import Optional, Union, BinaryIO
 import mimetypes
 import tempfile
 import functools
@@ -8,6 +9,34 @@ import functools
 from openai import AsyncAzureOpenAI, AsyncOpenAI
 from fastapi import UploadFile
 
+from ...utils.mime import get_mime_type
+
+# Magic-number prefixes for the audio containers Whisper accepts. Content
+# sniffing only needs the first few bytes; filename-based guessing stays
+# as the fallback for anything without a stable signature.
+_AUDIO_SIGNATURES = (
+    (b'fLaC', 'audio/flac'),
+    (b'OggS', 'audio/ogg'),
+    (b'ID3', 'audio/mpeg'),
+    (b'\x1aE\xdf\xa3', 'audio/webm'),
+)
+
+
+def _sniff_mime(header: bytes) -> Optional[str]:
+    """Identify an audio MIME type from the file's leading bytes."""
+    for signature, mime in _AUDIO_SIGNATURES:
+        if header.startswith(signature):
+            return mime
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'audio/wav'
+    if header[4:8] == b'ftyp':
+        return 'audio/mp4'
+    if len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0:
+        # Raw MPEG audio frame sync word
+        return 'audio/mpeg'
+    return None
+
+
 class WhisperTranscriber:
     SUPPORTED_FORMATS = {
         'audio/flac': 'flac',
@@ -17,7 +46,6 @@ class WhisperTranscriber:
         'audio/mpeg': 'mp3',
         'audio/mp4': 'mp4',
         'video/mp4': 'mp4',  # Some MP4 audio files might have video MIME type
-        'audio/mpeg': 'mpeg',
         'audio/mpga': 'mpga',
         'audio/ogg': 'ogg',
         'audio/x-wav': 'wav',
@@ -26,6 +54,9 @@ class WhisperTranscriber:
         'video/webm': 'webm',  # WebM can be either audio or video
         'application/octet-stream': None  # Handle unknown types more gracefully
     }
+    # Folded once at class creation instead of per validation call
+    _SUPPORTED_MIMES = frozenset(SUPPORTED_FORMATS)
+    _SUPPORTED_FORMAT_NAMES = tuple(sorted({v for v in SUPPORTED_FORMATS.values() if v}))
 
     def __init__(self, client: Union[AsyncAzureOpenAI, AsyncOpenAI], deployment_name: str = "whisper"):
         self.client = client
@@ -42,18 +73,17 @@ class WhisperTranscriber:
         Raises:
             ValueError: If the file format is not supported
         """
-        mime_type, _ = mimetypes.guess_type(file_content)
+        mime_type = _sniff_mime(file_content[:16])
 
-        # Fallback to mimetypes if python-magic fails or for unknown types
+        # Fall back to the filename when the bytes aren't recognized
         if not mime_type or mime_type == 'application/octet-stream':
             mime_type, _ = mimetypes.guess_type(filename or "unknown.unknown")
             mime_type = mime_type or 'application/octet-stream'  # Default if guess_type fails
 
-        if mime_type not in self.SUPPORTED_FORMATS:
-            supported_formats = list(set(self.SUPPORTED_FORMATS.values()))  # Get unique format names
+        if mime_type not in self._SUPPORTED_MIMES:
             raise ValueError(
                 f"Unsupported audio format with MIME type: {mime_type}. "
-                f"Supported formats: {sorted(supported_formats)}"
+                f"Supported formats: {list(self._SUPPORTED_FORMAT_NAMES)}"
             )
 
         # You could return the normalized format name if needed, or None if not explicitly supported
@@ -77,7 +107,12 @@ class WhisperTranscriber:
         try:
             # Validate format using filename
             #self._validate_audio_format(audio_path, filename)
-            audio_file = self._prepare_audio_file(audio_path)
+            data = await self._prepare_audio_file(audio_path)
+            if not filename and isinstance(audio_path, str):
+                filename = os.path.basename(audio_path)
+            # The SDK accepts (filename, bytes) tuples, so nothing needs to
+            # be staged in a temporary file
+            audio_file = (filename or "audio", data)
 
             # Transcribe using appropriate client
             if isinstance(self.client, AsyncAzureOpenAI):
@@ -100,33 +135,40 @@ class WhisperTranscriber:
             raise ValueError(f"Unicode decoding failed: {str(e)}")
         except Exception as e:
             raise ValueError(f"Transcription failed: {str(e)}")
-        finally:
-            if isinstance(audio_path, str) and 'audio_file' in locals():
-                audio_file.close()
 
-    def _prepare_audio_file(self, audio_path: Union[str, bytes, BinaryIO]) -> bytes:
+    async def _prepare_audio_file(self, audio_path: Union[str, bytes, BinaryIO]) -> bytes:
         """
         Prepare the audio file for transcription.
 
+        Reads run in a worker thread so multi-megabyte audio loads don't
+        block the event loop.
+
         Args:
             audio_path: File path, bytes, or file-like object
 
         Returns:
-            BinaryIO: File-like object ready for transcription
+            bytes: Audio data ready for transcription
         """
         if isinstance(audio_path, str):
             if not os.path.exists(audio_path):
                 raise FileNotFoundError(f"Audio file not found at {audio_path}")
-            return open(audio_path, "rb")
+            return await asyncio.to_thread(self._read_file, audio_path)
         elif isinstance(audio_path, bytes):
             return audio_path
         elif isinstance(audio_path, io.IOBase):
-            # Convert to bytes
-            return bytes(audio_path.read())
+            # read() already hands back an immutable bytes object for binary
+            # streams; copy only when it doesn't
+            data = await asyncio.to_thread(audio_path.read)
+            return data if isinstance(data, bytes) else bytes(data)
         else:
             raise ValueError(
                 "Invalid input type. Expected string path, bytes, file-like object, or UploadFile")
 
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
     def _get_mime_type(self, file_path: str) -> str:
         """
         Get MIME type of a file.
@@ -137,5 +179,4 @@ class WhisperTranscriber:
         Returns:
             str: MIME type of the file
         """
-        mime_type, _ = mimetypes.guess_type(file_path)
-        return mime_type or 'application/octet-stream'
\ No newline at end of file
+        return get_mime_type(file_path)
\ No newline at end of file
@@ -1,6 +1,15 @@
+from functools import lru_cache
 import mimetypes
+import os
+
+
+@lru_cache(maxsize=4096)
+def _guess_by_ext(ext: str) -> str:
+    mime_type, _ = mimetypes.guess_type(f"x{ext}")
+    return mime_type or 'application/octet-stream'  # Default to 'application/octet-stream' if type is None
 
 
 def get_mime_type(file_path):
-    mime_type, encoding = mimetypes.guess_type(file_path)
-    return mime_type or 'application/octet-stream'  # Default to 'application/octet-stream' if type is None
\ No newline at end of file
+    # The MIME type only depends on the extension, so cache per extension
+    # instead of walking mimetypes' tables for every file
+    return _guess_by_ext(os.path.splitext(file_path)[1].lower())
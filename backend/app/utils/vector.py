@@ -1,11 +1,25 @@
-from typing import List
+from typing import List, Union
 
 import numpy as np
 
+VectorLike = Union[List[float], np.ndarray]
 
-def calculate_vector_similarity(self, vec1: List[float], vec2: List[float]) -> float:
+
+def calculate_vector_similarity(vec1: VectorLike, vec2: VectorLike) -> float:
     """Calculate cosine similarity between two vectors."""
-    import numpy as np
-    v1 = np.array(vec1)
-    v2 = np.array(vec2)
-    return np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
\ No newline at end of file
+    v1 = np.asarray(vec1, dtype=np.float32)
+    v2 = np.asarray(vec2, dtype=np.float32)
+    return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
+
+
+def calculate_vector_similarities(query: VectorLike, matrix: VectorLike) -> np.ndarray:
+    """
+    Cosine similarity between one query vector and K row vectors.
+
+    Runs as a single BLAS matrix-vector product over a contiguous float32
+    (K, D) matrix, instead of K separate Python-level dot products.
+    """
+    q = np.asarray(query, dtype=np.float32)
+    m = np.ascontiguousarray(matrix, dtype=np.float32)
+    q = q / np.linalg.norm(q)
+    return (m / np.linalg.norm(m, axis=1, keepdims=True)) @ q